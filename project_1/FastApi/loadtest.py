@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import time
+
+import httpx
+
+# python loadtest.py sync=http://127.0.0.1:8001 async=http://127.0.0.1:8002 --concurrency 32 --duration 10
+
+PATHS = [
+    '/movie/list/',
+    '/director/list/',
+    '/actor/with/movie/',
+    '/movie/with/director/',
+    '/director/with/rating/',
+    '/movie/comment/short/',
+    '/movie/filter/by/rating/?min_rating=7',
+]
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def worker(client, paths, offset, deadline, latencies, errors):
+    number = offset
+    while time.perf_counter() < deadline:
+        path = paths[number % len(paths)]
+        number += 1
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+        except httpx.HTTPError:
+            errors.append(path)
+            continue
+        if response.status_code != 200:
+            errors.append(path)
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(base_url, paths, concurrency, duration, warmup):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        for path in paths:
+            for _ in range(warmup):
+                await client.get(path)
+        latencies, errors = [], []
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(worker(client, paths, offset, deadline, latencies, errors) for offset in range(concurrency)))
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare requests/sec and tail latency of running FastAPI servers')
+    parser.add_argument('targets', nargs='+', help='label=base_url, e.g. sync=http://127.0.0.1:8001')
+    parser.add_argument('--path', action='append', dest='paths', help='endpoint to hit, repeatable (default: the read endpoints)')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--warmup', type=int, default=3, help='requests per path before measuring')
+    args = parser.parse_args()
+
+    print(f'{"target":10} {"requests":>9} {"req/s":>8} {"p50":>9} {"p95":>9} {"p99":>9} {"errors":>7}')
+    for target in args.targets:
+        label, _, base_url = target.partition('=')
+        latencies, errors = asyncio.run(run(base_url, args.paths or PATHS, args.concurrency, args.duration, args.warmup))
+        print(
+            f'{label:10} {len(latencies):9} {len(latencies) / args.duration:8.1f} {percentile(latencies, 0.5) * 1000:7.1f}ms '
+            f'{percentile(latencies, 0.95) * 1000:7.1f}ms {percentile(latencies, 0.99) * 1000:7.1f}ms {len(errors):7}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,28 @@
 from typing import Annotated
 
 from pydantic import BaseModel
-from sqlmodel import SQLModel, Field, Session, Relationship, create_engine, select, func, and_, or_, Table, Column, ForeignKey
-from fastapi import FastAPI, Depends, Query, HTTPException
+from sqlalchemy import URL, event, text, update
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import load_only, selectinload
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlmodel import SQLModel, Field, Relationship, select, func, and_, or_, Table, Column, ForeignKey
+from sqlmodel.ext.asyncio.session import AsyncSession
+from fastapi import FastAPI, Depends, Query, HTTPException, Request, Response
+import base64
+import binascii
 import datetime
+import email.utils
+import hashlib
+import json
+import orjson
+import os
+import random
+import sys
+from dataclasses import dataclass
 
-from starlette.responses import JSONResponse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from imdb.sqlite import profile_pragmas
 
 
 #fastapi dev main.py
@@ -16,7 +33,7 @@ class Director(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
     first_name: str
     last_name: str
-    birth_date: datetime.date
+    birth_date: datetime.date | None
     movies: list['Movie'] = Relationship(back_populates='director')
 
 
@@ -31,7 +48,7 @@ class Actor(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
     first_name: str
     last_name: str
-    birth_date: datetime.date
+    birth_date: datetime.date | None
     movies: list['Movie'] = Relationship(back_populates='actors', link_model=ActorMovieLink)
 
 
@@ -114,138 +131,398 @@ class ActorWithMovie(BaseModel):
     movies: list[MovieShort]
 
 
-sqlite_file_name = "../db.sqlite3"
-sqlite_url = f"sqlite:///{sqlite_file_name}"
+class TableVersion(SQLModel, table=True):
+    __tablename__ = 'imdb_tableversion'
+    name: str = Field(primary_key=True)
+    version: int
+    modified: datetime.datetime
+
+
+# IMDB_SQLITE_PROFILE picks the same profile as the Django settings
+SQLITE_PRAGMAS = profile_pragmas()
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+    cursor.close()
+
+
+# the same IMDB_DB_* variables as project_1/settings.py pick the database and its replicas (through aiosqlite or
+# asyncpg); IMDB_SQL_ECHO=1 logs every statement
+database_engine = os.environ.get('IMDB_DB_ENGINE', 'sqlite3')
+
+
+def database_url(location=None):
+    if database_engine == 'postgresql':
+        return URL.create(
+            'postgresql+asyncpg',
+            username=os.environ.get('IMDB_DB_USER', 'imdb'),
+            password=os.environ.get('IMDB_DB_PASSWORD') or None,
+            host=location or os.environ.get('IMDB_DB_HOST', 'localhost'),
+            port=int(os.environ.get('IMDB_DB_PORT', 5432)),
+            database=os.environ.get('IMDB_DB_NAME', 'imdb'),
+        )
+    return f"sqlite+aiosqlite:///{location or os.environ.get('IMDB_DB_NAME', '../db.sqlite3')}"
+
+
+def make_engine(url):
+    new_engine = create_async_engine(
+        url,
+        echo=os.environ.get('IMDB_SQL_ECHO') == '1',
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=int(os.environ.get('IMDB_DB_POOL_SIZE', 10)),
+        max_overflow=int(os.environ.get('IMDB_DB_POOL_OVERFLOW', 20)),
+        pool_timeout=int(os.environ.get('IMDB_DB_POOL_TIMEOUT', 10)),
+        pool_recycle=1800,
+        pool_pre_ping=database_engine == 'postgresql',
+    )
+    if new_engine.dialect.name == 'sqlite':
+        event.listen(new_engine.sync_engine, 'connect', set_sqlite_pragmas)
+    return new_engine
+
+
+engine = make_engine(database_url())
+replica_engines = [make_engine(database_url(location.strip())) for location in filter(None, os.environ.get('IMDB_DB_REPLICAS', '').split(','))]
 
-engine = create_engine(sqlite_url, echo=True)
+# shared with imdb.middleware.ReplicaRoutingMiddleware, so a write on either app pins reads on both
+PRIMARY_COOKIE = 'imdb_primary'
+REPLICA_STICKY_SECONDS = int(os.environ.get('IMDB_REPLICA_STICKY_SECONDS', 10))
 
 
-def get_session():
-    with Session(engine) as session:
+async def get_session(response: Response):
+    if replica_engines:
+        response.set_cookie(PRIMARY_COOKIE, '1', max_age=REPLICA_STICKY_SECONDS, httponly=True, samesite='lax')
+    async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
 
 
-SessionDep = Annotated[Session, Depends(get_session)]
+async def get_read_session(request: Request):
+    read_engine = engine if not replica_engines or PRIMARY_COOKIE in request.cookies else random.choice(replica_engines)
+    async with AsyncSession(read_engine) as session:
+        yield session
+
+
+SessionDep = Annotated[AsyncSession, Depends(get_session)]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
+
+
+# every list endpoint takes limit plus either offset or the opaque cursor from the previous page's X-Next-Cursor
+# header; sort names map to indexed columns, and id breaks ties so keyset pages never skip or repeat a row
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+@dataclass
+class Page:
+    model: type
+    limit: int
+    offset: int
+    sort: str
+    columns: list
+    cursor: list | None
+
+
+def dump_value(value):
+    return value.isoformat() if isinstance(value, (datetime.date, datetime.datetime)) else value
+
+
+def load_value(column, value):
+    python_type = column.type.python_type
+    return python_type.fromisoformat(value) if python_type in (datetime.date, datetime.datetime) else value
+
+
+def encode_cursor(sort, values):
+    payload = json.dumps({'s': sort, 'v': [dump_value(value) for value in values]})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor, sort, columns):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if payload['s'] != sort or len(payload['v']) != len(columns):
+            raise ValueError(cursor)
+        return [load_value(column, value) for (column, _), value in zip(columns, payload['v'])]
+    except (binascii.Error, KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+
+
+class Pagination:
+    def __init__(self, model, sorts, default):
+        self.model = model
+        self.sorts = sorts
+        self.default = default
+
+    def __call__(self,
+                 limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                 offset: int = Query(0, ge=0),
+                 cursor: str | None = Query(None, description='X-Next-Cursor of the previous page'),
+                 sort: str | None = Query(None, description='field name, prefixed with - for descending')) -> Page:
+        sort = sort or self.default
+        name = sort.removeprefix('-')
+        if name not in self.sorts:
+            raise HTTPException(status_code=400, detail=f'sort must be one of: {", ".join(sorted(self.sorts))}')
+        columns = [(column, sort.startswith('-')) for column in (*self.sorts[name], self.model.id)]
+        return Page(self.model, limit, offset, sort, columns, decode_cursor(cursor, sort, columns) if cursor else None)
+
+
+def keyset_condition(columns, values):
+    clauses = []
+    for index, (column, descending) in enumerate(columns):
+        equal = [previous == value for (previous, _), value in zip(columns[:index], values)]
+        clauses.append(and_(*equal, column < values[index] if descending else column > values[index]))
+    return or_(*clauses)
+
+
+async def estimated_count(session, model):
+    # planner statistics on PostgreSQL, the highest id otherwise; both avoid scanning the table like COUNT(*) does
+    if database_engine == 'postgresql':
+        estimate = (await session.execute(text('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)'), {'name': model.__tablename__})).scalar()
+        if estimate and estimate > 0:
+            return estimate
+    return (await session.exec(select(func.max(model.id)))).one() or 0
+
+
+async def paginate(session, statement, page, response, estimate=False):
+    statement = statement.order_by(None).order_by(*(column.desc() if descending else column.asc() for column, descending in page.columns))
+    if page.cursor is None:
+        statement = statement.offset(page.offset)
+    else:
+        statement = statement.where(keyset_condition(page.columns, page.cursor))
+    rows = (await session.exec(statement.limit(page.limit + 1))).all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers['X-Next-Cursor'] = encode_cursor(page.sort, [getattr(rows[-1], column.key) for column, _ in page.columns])
+    if estimate:
+        response.headers['X-Total-Count-Estimate'] = str(await estimated_count(session, page.model))
+    return rows
+
+
+# the per-table change counters the Django signals keep in imdb_tableversion (imdb/versions.py): ETag and
+# Last-Modified are built from them alone, so a matching If-None-Match or If-Modified-Since is answered with a 304
+# before the endpoint queries anything. Writes here bump them the same way
+
+def etag_matches(header, etag):
+    return any(tag.strip() in ('*', etag) or tag.strip().removeprefix('W/') == etag for tag in header.split(','))
+
+
+def not_modified_since(header, last_modified):
+    try:
+        since = email.utils.parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    return since.tzinfo is not None and int(last_modified.timestamp()) <= since.timestamp()
+
+
+class Conditional:
+    def __init__(self, *models):
+        self.tables = sorted({model.__tablename__ for model in models})
+
+    async def __call__(self, request: Request, response: Response, session: ReadSessionDep):
+        statement = select(TableVersion.name, TableVersion.version, TableVersion.modified).where(TableVersion.name.in_(self.tables))
+        versions = {name: (version, modified) for name, version, modified in (await session.exec(statement)).all()}
+        key = ','.join(f'{name}:{versions.get(name, (0,))[0]}' for name in self.tables)
+        headers = {'ETag': f'"{hashlib.md5(f"{key}|".encode()).hexdigest()}"'}
+        last_modified = max((modified for _, modified in versions.values()), default=None)
+        if last_modified is not None:
+            last_modified = last_modified if last_modified.tzinfo else last_modified.replace(tzinfo=datetime.timezone.utc)
+            headers['Last-Modified'] = email.utils.formatdate(last_modified.timestamp(), usegmt=True)
+        if_none_match = request.headers.get('if-none-match')
+        if_modified_since = request.headers.get('if-modified-since')
+        if if_none_match is not None:
+            not_modified = etag_matches(if_none_match, headers['ETag'])
+        else:
+            not_modified = bool(if_modified_since and last_modified and not_modified_since(if_modified_since, last_modified))
+        if not_modified:
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+
+async def bump_versions(session, *models):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    for model in models:
+        result = await session.exec(update(TableVersion).where(TableVersion.name == model.__tablename__).values(version=TableVersion.version + 1, modified=now))
+        if not result.rowcount:
+            session.add(TableVersion(name=model.__tablename__, version=1, modified=now))
+
+
 app = FastAPI()
 
 
-@app.get('/director/list/', response_model=list[Director])
-def read_director_list(session: SessionDep) -> list[Director]:
-    object_list = session.exec(select(Director)).all()
-    return object_list
+# relationships are serialized after the endpoint returns, where an async session cannot lazy-load them,
+# so every endpoint whose response model nests a collection loads it up front: selectinload (one extra statement,
+# no row multiplication) and load_only for the columns the model reads. To-one relations are plain joins in the
+# column selects below
 
+ACTOR_WITH_MOVIE = (load_only(Actor.first_name, Actor.last_name), selectinload(Actor.movies).load_only(Movie.title, Movie.rating))
+DIRECTOR_WITH_MOVIE = (load_only(Director.first_name, Director.last_name), selectinload(Director.movies).load_only(Movie.title, Movie.rating))
+MOVIE_WITH_DIRECTOR = select(Movie.id, Movie.title, Movie.rating, Director.first_name, Director.last_name).join(Movie.director)
+COMMENT_WITH_AUTHOR = select(MovieComment.id, MovieComment.text, MovieComment.created, User.id.label('author_id'), User.username).join(MovieComment.author)
 
-@app.get('/movie/list/', response_model=list[Movie])
-def read_movie_list(session: SessionDep) -> list[Movie]:
-    object_list = session.exec(select(Movie)).all()
-    return object_list
+
+PERSON_SORTS = {
+    Director: {'last_name': (Director.last_name, Director.first_name), 'id': ()},
+    Actor: {'last_name': (Actor.last_name, Actor.first_name), 'id': ()},
+}
+DirectorPage = Annotated[Page, Depends(Pagination(Director, PERSON_SORTS[Director], 'last_name'))]
+ActorPage = Annotated[Page, Depends(Pagination(Actor, PERSON_SORTS[Actor], 'last_name'))]
+MoviePage = Annotated[Page, Depends(Pagination(Movie, {'date': (Movie.date,), 'rating': (Movie.rating,), 'title': (Movie.title,), 'id': ()}, '-date'))]
+# MOVIE_WITH_DIRECTOR does not select date, so those endpoints cannot sort or page on it
+MovieWithDirectorPage = Annotated[Page, Depends(Pagination(Movie, {'rating': (Movie.rating,), 'title': (Movie.title,), 'id': ()}, '-rating'))]
+CommentPage = Annotated[Page, Depends(Pagination(MovieComment, {'id': ()}, '-id'))]
+
+DIRECTOR_VERSIONS = [Depends(Conditional(Director))]
+ACTOR_VERSIONS = [Depends(Conditional(Actor))]
+# movies carry director_id, which Django nulls with a bare UPDATE when a director is deleted, so only the
+# director table's version moves
+MOVIE_DIRECTOR_VERSIONS = [Depends(Conditional(Movie, Director))]
+MOVIE_ACTOR_VERSIONS = [Depends(Conditional(Actor, Movie, ActorMovieLink))]
+COMMENT_VERSIONS = [Depends(Conditional(MovieComment))]
+
+
+# flat and to-one list endpoints select plain columns instead of ORM instances and hand the row tuples straight to
+# orjson, skipping both the identity map and a second validation pass against the response model (which stays for
+# the schema); typed table columns already match it. Endpoints that nest a collection keep FastAPI's own serializer,
+# which dumps JSON in Pydantic's core; a global ORJSONResponse default would turn that off. serialization_benchmark.py
+# compares the paths
+
+def row_dicts(rows):
+    fields = rows[0]._fields if rows else ()
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def json_rows(content, response):
+    rendered = Response(orjson.dumps(content, option=orjson.OPT_UTC_Z), media_type='application/json')
+    rendered.headers.raw.extend(response.headers.raw)
+    return rendered
+
+
+def movie_with_director(rows):
+    return [{'title': title, 'rating': rating, 'director': {'first_name': first_name, 'last_name': last_name}} for _, title, rating, first_name, last_name in rows]
+
+
+def comment_with_author(rows):
+    return [{'id': pk, 'text': body, 'author': {'id': author_id, 'username': username}, 'created': created} for pk, body, created, author_id, username in rows]
 
 
-@app.get('/movie/{pk}/', response_model=Movie)
-def read_movie_detail(session: SessionDep, pk: int) -> Movie:
-    object = session.get(Movie, pk)
+@app.get('/director/list/', response_model=list[Director], dependencies=DIRECTOR_VERSIONS)
+async def read_director_list(session: ReadSessionDep, page: DirectorPage, response: Response) -> list[Director]:
+    rows = await paginate(session, select(*Director.__table__.columns), page, response, estimate=True)
+    return json_rows(row_dicts(rows), response)
+
+
+@app.get('/movie/list/', response_model=list[Movie], dependencies=MOVIE_DIRECTOR_VERSIONS)
+async def read_movie_list(session: ReadSessionDep, page: MoviePage, response: Response) -> list[Movie]:
+    rows = await paginate(session, select(*Movie.__table__.columns), page, response, estimate=True)
+    return json_rows(row_dicts(rows), response)
+
+
+@app.get('/movie/{pk:int}/', response_model=Movie, dependencies=MOVIE_DIRECTOR_VERSIONS)
+async def read_movie_detail(session: ReadSessionDep, pk: int) -> Movie:
+    object = await session.get(Movie, pk)
     return object
 
 
-@app.get('/actor/list/', response_model=list[Actor])
-def read_actor_list(session:SessionDep) -> list[Actor]:
-    object_list = session.exec(select(Actor)).all()
-    return object_list
+@app.get('/actor/list/', response_model=list[Actor], dependencies=ACTOR_VERSIONS)
+async def read_actor_list(session:ReadSessionDep, page: ActorPage, response: Response) -> list[Actor]:
+    rows = await paginate(session, select(*Actor.__table__.columns), page, response, estimate=True)
+    return json_rows(row_dicts(rows), response)
 
 
-@app.get('/actor/with/movie/', response_model=list[ActorWithMovie])
-def read_actor_with_movie(session:SessionDep) -> list[ActorWithMovie]:
-    object_list = session.exec(select(Actor)).all()
+@app.get('/actor/with/movie/', response_model=list[ActorWithMovie], dependencies=MOVIE_ACTOR_VERSIONS)
+async def read_actor_with_movie(session:ReadSessionDep, page: ActorPage, response: Response) -> list[ActorWithMovie]:
+    object_list = await paginate(session, select(Actor).options(*ACTOR_WITH_MOVIE), page, response, estimate=True)
     return object_list
 
 
-@app.get('/movie/with/director/', response_model=list[MovieWithDirector])
-def read_movie_with_director(session: SessionDep) -> list[MovieWithDirector]:
-    object_list = session.exec(select(Movie)).all()
-    return object_list
+@app.get('/movie/with/director/', response_model=list[MovieWithDirector], dependencies=MOVIE_DIRECTOR_VERSIONS)
+async def read_movie_with_director(session: ReadSessionDep, page: MovieWithDirectorPage, response: Response) -> list[MovieWithDirector]:
+    rows = await paginate(session, MOVIE_WITH_DIRECTOR, page, response, estimate=True)
+    return json_rows(movie_with_director(rows), response)
 
 
-@app.get('/director/with/movie/', response_model=list[DirectorWithMovie])
-def read_director_with_movie(session: SessionDep) -> list[DirectorWithMovie]:
-    object_list = session.exec(select(Director)).all()
+@app.get('/director/with/movie/', response_model=list[DirectorWithMovie], dependencies=MOVIE_DIRECTOR_VERSIONS)
+async def read_director_with_movie(session: ReadSessionDep, page: DirectorPage, response: Response) -> list[DirectorWithMovie]:
+    object_list = await paginate(session, select(Director).options(*DIRECTOR_WITH_MOVIE), page, response, estimate=True)
     return object_list
 
 
-@app.get('/director/with/rating/', response_model=list[DirectorWithRating])
-def read_director_with_rating(session: SessionDep) -> list[DirectorWithRating]:
-    # statement = select(Director.first_name, Director.last_name, func.coalesce(func.avg(Movie.rating), 0.0), func.count(Movie.id)).join(Movie, isouter=True).group_by(Director.id)
+@app.get('/director/with/rating/', response_model=list[DirectorWithRating], dependencies=MOVIE_DIRECTOR_VERSIONS)
+async def read_director_with_rating(session: ReadSessionDep, page: DirectorPage, response: Response) -> list[DirectorWithRating]:
     statement = (
                 select(
+                    Director.id,
                     Director.first_name,
                     Director.last_name,
-                    func.coalesce(func.avg(Movie.rating), 0.0),
-                    func.count(Movie.id)
+                    func.coalesce(func.avg(Movie.rating), 0.0).label('avg_rating'),
+                    func.count(Movie.id).label('num_movies')
                 )
                 .join(Movie, isouter=True)
                 .group_by(Director.id)
-                .order_by(Director.last_name)
     )
-    object_list = session.exec(statement).all()
-    print(object_list)
-    response = [DirectorWithRating(first_name=first, last_name=last, avg_rating=rating, num_movies=num_movies) for first, last, rating, num_movies in object_list]
-    return response
+    rows = await paginate(session, statement, page, response, estimate=True)
+    content = [{'first_name': first_name, 'last_name': last_name, 'avg_rating': avg_rating, 'num_movies': num_movies} for _, first_name, last_name, avg_rating, num_movies in rows]
+    return json_rows(content, response)
 
 
-@app.get('/movie/comment/', response_model=list[MovieComment])
-def read_movie_comment(session: SessionDep) -> list[MovieComment]:
-    object_list = session.exec(select(MovieComment)).all()
-    return object_list
+@app.get('/movie/comment/', response_model=list[MovieComment], dependencies=COMMENT_VERSIONS)
+async def read_movie_comment(session: ReadSessionDep, page: CommentPage, response: Response) -> list[MovieComment]:
+    rows = await paginate(session, select(*MovieComment.__table__.columns), page, response, estimate=True)
+    return json_rows(row_dicts(rows), response)
 
 
-@app.get('/movie/comment/short/', response_model=list[MovieCommentRead])
-def read_movie_comment_short(session: SessionDep) -> list[MovieCommentRead]:
-    object_list = session.exec(select(MovieComment)).all()
-    return object_list
+@app.get('/movie/comment/short/', response_model=list[MovieCommentRead], dependencies=COMMENT_VERSIONS)
+async def read_movie_comment_short(session: ReadSessionDep, page: CommentPage, response: Response) -> list[MovieCommentRead]:
+    rows = await paginate(session, COMMENT_WITH_AUTHOR, page, response, estimate=True)
+    return json_rows(comment_with_author(rows), response)
 
 
-@app.get('/movie/filter/by/rating/', response_model=list[MovieWithDirector])
-def read_movie_filter_by_rating(session: SessionDep,
-                                min_rating: float = Query(0.0, description='min rate'),
-                                max_rating: float = Query(10.0, description='max_rate')
-                                ) -> list[MovieWithDirector]:
-    statment = select(Movie).where(and_(Movie.rating >= min_rating, Movie.rating <= max_rating))
-    object_list = session.exec(statment).all()
-    return object_list
+@app.get('/movie/filter/by/rating/', response_model=list[MovieWithDirector], dependencies=MOVIE_DIRECTOR_VERSIONS)
+async def read_movie_filter_by_rating(session: ReadSessionDep,
+                                      page: MovieWithDirectorPage,
+                                      response: Response,
+                                      min_rating: float = Query(0.0, description='min rate'),
+                                      max_rating: float = Query(10.0, description='max_rate')
+                                      ) -> list[MovieWithDirector]:
+    statment = MOVIE_WITH_DIRECTOR.where(and_(Movie.rating >= min_rating, Movie.rating <= max_rating))
+    rows = await paginate(session, statment, page, response)
+    return json_rows(movie_with_director(rows), response)
 
 
-@app.get('/director/with/movie/filter/', response_model=list[DirectorWithMovie])
-def read_director_with_movie_filter(session: SessionDep,
-                                    q: str = Query('', description='search pattern')) -> list[DirectorWithMovie]:
+@app.get('/director/with/movie/filter/', response_model=list[DirectorWithMovie], dependencies=MOVIE_DIRECTOR_VERSIONS)
+async def read_director_with_movie_filter(session: ReadSessionDep,
+                                          page: DirectorPage,
+                                          response: Response,
+                                          q: str = Query('', description='search pattern')) -> list[DirectorWithMovie]:
     statment = (
         select(Director)
         .where(or_(Director.first_name.ilike(f'%{q}%'), Director.last_name.ilike(f'%{q}%')))
-        .order_by(Director.last_name)
+        .options(*DIRECTOR_WITH_MOVIE)
     )
-    object_list = session.exec(statment).all()
+    object_list = await paginate(session, statment, page, response)
     return object_list
 
 
 @app.patch('/movie/title/update/{pk}/', response_model=Movie)
-def update_movie_title(session: SessionDep, pk: int, new_title: str) -> Movie:
-    movie = session.get(Movie, pk)
+async def update_movie_title(session: SessionDep, pk: int, new_title: str) -> Movie:
+    movie = await session.get(Movie, pk)
     if not movie:
         raise HTTPException(status_code=404, detail='Movie not found')
     movie.title = new_title
     session.add(movie)
-    session.commit()
-    session.refresh(movie)
+    await bump_versions(session, Movie)
+    await session.commit()
+    await session.refresh(movie)
     return movie
 
 
 @app.delete('/delete/director/{pk}/', response_model=Director)
-def delete_director(session: SessionDep, pk: int) -> Director:
-    director = session.get(Director, pk)
+async def delete_director(session: SessionDep, response: Response, pk: int) -> Director:
+    director = await session.get(Director, pk)
     if not director:
         raise HTTPException(status_code=404, detail='Director not found')
-    session.delete(director)
-    session.commit()
-    return JSONResponse(content={'message': 'Director is deleted'})
-
-
-
-
+    await session.delete(director)
+    await bump_versions(session, Director, Movie)
+    await session.commit()
+    return json_rows({'message': 'Director is deleted'}, response)
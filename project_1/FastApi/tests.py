@@ -0,0 +1,217 @@
+import datetime
+import importlib
+import os
+import tempfile
+import typing
+import unittest
+
+from sqlalchemy import create_engine, event, update
+from sqlmodel import Session, SQLModel
+
+# cd FastApi && python -m unittest tests
+
+main = None
+
+
+def setUpModule():
+    global main, tmp_dir
+    tmp_dir = tempfile.TemporaryDirectory()
+    os.environ['IMDB_DB_NAME'] = os.path.join(tmp_dir.name, 'fastapi.sqlite3')
+    os.environ.pop('IMDB_DB_REPLICAS', None)
+    main = importlib.import_module('main')
+    seed(create_engine(f"sqlite:///{os.environ['IMDB_DB_NAME']}"))
+
+
+def tearDownModule():
+    tmp_dir.cleanup()
+
+
+def seed(engine):
+    SQLModel.metadata.create_all(engine)
+    now = datetime.datetime(2024, 1, 1, 12, 0, tzinfo=datetime.timezone.utc)
+    with Session(engine) as session:
+        directors = [main.Director(first_name=f'Director{i}', last_name=f'Last{i}', birth_date=datetime.date(1950, 1, 1)) for i in range(4)]
+        actors = [main.Actor(first_name=f'Actor{i}', last_name=f'Last{i}', birth_date=None) for i in range(6)]
+        users = [main.User(username=f'user{i}') for i in range(3)]
+        session.add_all(directors + actors + users)
+        session.flush()
+        movies = [
+            main.Movie(title=f'Movie {i}', rating=5 + i % 5, date=datetime.date(2000 + i, 1, 1), director_id=directors[i % 4].id, actors=actors[i % 3:i % 3 + 3])
+            for i in range(10)
+        ]
+        session.add_all(movies)
+        session.flush()
+        session.add_all([
+            main.MovieComment(text=f'comment {i}', movie_id=movies[i].id, author_id=users[i % 3].id, created=now, updated=now)
+            for i in range(8)
+        ])
+        # filled by the Django migration that creates the table
+        session.add_all([main.TableVersion(name=model.__tablename__, version=1, modified=now) for model in (main.Movie, main.Director, main.Actor, main.ActorMovieLink, main.MovieComment)])
+        session.commit()
+
+
+class StatementCountTest(unittest.TestCase):
+    # the table versions, then one statement per table the response model reads, however many rows come back, plus
+    # the total estimate on unfiltered lists
+    BUDGETS = {
+        '/actor/with/movie/': 4,
+        '/director/with/movie/': 4,
+        '/director/with/movie/filter/?q=Last': 3,
+        '/movie/with/director/': 3,
+        '/movie/filter/by/rating/?min_rating=6': 2,
+        '/movie/comment/short/': 3,
+    }
+
+    def setUp(self):
+        from fastapi.testclient import TestClient
+        self.client = TestClient(main.app)
+        self.statements = []
+        event.listen(main.engine.sync_engine, 'before_cursor_execute', self.record)
+
+    def tearDown(self):
+        event.remove(main.engine.sync_engine, 'before_cursor_execute', self.record)
+
+    def record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def test_relationship_endpoints_use_a_fixed_number_of_statements(self):
+        for path, budget in self.BUDGETS.items():
+            with self.subTest(path=path):
+                self.statements.clear()
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.json())
+                self.assertEqual(len(self.statements), budget, '\n'.join(self.statements))
+
+    def test_projections_match_response_models(self):
+        self.client.get('/movie/with/director/')
+        self.assertNotIn('birth_date', self.statements[1])
+        self.assertNotIn('imdb_movie.date', self.statements[1])
+        movies = self.client.get('/actor/with/movie/').json()
+        self.assertEqual(set(movies[0]), {'first_name', 'last_name', 'movies'})
+        self.assertEqual(set(movies[0]['movies'][0]), {'title', 'rating'})
+
+    def test_row_endpoints_match_response_models(self):
+        # these skip FastAPI's response validation, so the payload has to be exactly what the model would produce
+        for route in main.app.routes:
+            if 'GET' not in getattr(route, 'methods', ()) or '{' in route.path or route.path.startswith(('/docs', '/openapi', '/redoc')):
+                continue
+            with self.subTest(path=route.path):
+                content = self.client.get(route.path).json()
+                model, = typing.get_args(route.response_model)
+                self.assertTrue(content)
+                self.assertEqual([model.model_validate(item).model_dump(mode='json') for item in content], content)
+
+
+class ConditionalRequestTest(unittest.TestCase):
+    def setUp(self):
+        from fastapi.testclient import TestClient
+        self.client = TestClient(main.app)
+
+    def test_unchanged_lists_return_304_after_one_statement(self):
+        response = self.client.get('/movie/with/director/')
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(main.engine.sync_engine, 'before_cursor_execute', record)
+        try:
+            not_modified = self.client.get('/movie/with/director/', headers={'If-None-Match': response.headers['ETag']})
+        finally:
+            event.remove(main.engine.sync_engine, 'before_cursor_execute', record)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        self.assertEqual(not_modified.headers['ETag'], response.headers['ETag'])
+        self.assertEqual(len(statements), 1)
+
+    def test_writes_change_the_etag(self):
+        movie = self.client.get('/movie/list/', params={'sort': 'id', 'limit': 1}).json()[0]
+        response = self.client.get(f'/movie/{movie["id"]}/')
+        comments = self.client.get('/movie/comment/')
+        self.assertEqual(self.client.patch(f'/movie/title/update/{movie["id"]}/', params={'new_title': movie['title']}).status_code, 200)
+        self.assertEqual(self.client.get(f'/movie/{movie["id"]}/', headers={'If-None-Match': response.headers['ETag']}).status_code, 200)
+        self.assertEqual(self.client.get('/movie/comment/', headers={'If-None-Match': comments.headers['ETag']}).status_code, 304)
+
+    def test_movies_follow_the_director_table(self):
+        movie = self.client.get('/movie/list/', params={'sort': 'id', 'limit': 1}).json()[0]
+        responses = [self.client.get('/movie/list/'), self.client.get(f'/movie/{movie["id"]}/')]
+        with create_engine(f"sqlite:///{os.environ['IMDB_DB_NAME']}").begin() as connection:
+            connection.execute(update(main.TableVersion).where(main.TableVersion.name == main.Director.__tablename__).values(version=main.TableVersion.version + 1))
+        for response in responses:
+            self.assertEqual(self.client.get(response.url, headers={'If-None-Match': response.headers['ETag']}).status_code, 200)
+
+    def test_if_modified_since(self):
+        response = self.client.get('/actor/list/')
+        self.assertEqual(self.client.get('/actor/list/', headers={'If-Modified-Since': response.headers['Last-Modified']}).status_code, 304)
+        self.assertEqual(self.client.get('/actor/list/', headers={'If-Modified-Since': 'Mon, 01 Jan 1990 00:00:00 GMT'}).status_code, 200)
+
+
+class PrimaryCookieTest(unittest.TestCase):
+    def setUp(self):
+        from fastapi.testclient import TestClient
+        self.client = TestClient(main.app)
+        self.replica_engines = main.replica_engines
+        main.replica_engines = [main.engine]
+
+    def tearDown(self):
+        main.replica_engines = self.replica_engines
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        with Session(create_engine(f"sqlite:///{os.environ['IMDB_DB_NAME']}")) as session:
+            director = main.Director(first_name='Removed', last_name='Director', birth_date=None)
+            session.add(director)
+            session.commit()
+            pk = director.id
+        response = self.client.delete(f'/delete/director/{pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'message': 'Director is deleted'})
+        self.assertIn(main.PRIMARY_COOKIE, response.cookies)
+        response = self.client.patch('/movie/title/update/1/', params={'new_title': 'Movie 0'})
+        self.assertIn(main.PRIMARY_COOKIE, response.cookies)
+
+
+class PaginationTest(unittest.TestCase):
+    def setUp(self):
+        from fastapi.testclient import TestClient
+        self.client = TestClient(main.app)
+
+    def walk(self, path, **params):
+        rows, cursor = [], None
+        while True:
+            response = self.client.get(path, params={**params, **({'cursor': cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.json()), params.get('limit', main.DEFAULT_PAGE_SIZE))
+            rows.extend(response.json())
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                return rows
+
+    def test_cursor_walks_every_row_once_in_order(self):
+        full = self.client.get('/movie/list/', params={'sort': '-rating', 'limit': 100}).json()
+        self.assertEqual(len(full), 10)
+        self.assertEqual(self.walk('/movie/list/', sort='-rating', limit=3), full)
+        self.assertEqual([movie['rating'] for movie in full], sorted((movie['rating'] for movie in full), reverse=True))
+        self.assertEqual(self.walk('/movie/list/', sort='date', limit=4), sorted(full, key=lambda movie: movie['date']))
+        self.assertEqual(len(self.walk('/director/with/rating/', limit=3)), 4)
+
+    def test_offset_pages(self):
+        first = self.client.get('/actor/list/', params={'limit': 4})
+        second = self.client.get('/actor/list/', params={'limit': 4, 'offset': 4})
+        self.assertEqual([actor['id'] for actor in first.json() + second.json()], [actor['id'] for actor in self.walk('/actor/list/')])
+        self.assertIn('X-Next-Cursor', first.headers)
+        self.assertNotIn('X-Next-Cursor', second.headers)
+        self.assertEqual(first.headers['X-Total-Count-Estimate'], '6')
+
+    def test_filtered_lists_skip_the_estimate(self):
+        response = self.client.get('/movie/filter/by/rating/', params={'min_rating': 8, 'limit': 2})
+        self.assertEqual(len(response.json()), 2)
+        self.assertNotIn('X-Total-Count-Estimate', response.headers)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/movie/list/', params={'limit': main.MAX_PAGE_SIZE + 1}).status_code, 422)
+        self.assertEqual(self.client.get('/movie/list/', params={'sort': 'plot'}).status_code, 400)
+        self.assertEqual(self.client.get('/movie/list/', params={'cursor': 'garbage'}).status_code, 400)
+        cursor = self.client.get('/movie/list/', params={'limit': 2}).headers['X-Next-Cursor']
+        self.assertEqual(self.client.get('/movie/list/', params={'sort': 'title', 'cursor': cursor}).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
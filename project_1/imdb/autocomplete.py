@@ -0,0 +1,139 @@
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from .models import Actor, Director, Movie
+from .versions import version_stamp
+
+# prefixes up to this length match too many keys to rank by scanning, so each one keeps its entries in rating order
+SHORT_PREFIX = 3
+
+# the signals keep this process's index current, but the rating refreshes, bulk loads and FastAPI writes go around
+# them; all of those bump a table version, so the index reloads when the stamp of these tables moves
+INDEXED_MODELS = (Movie, Actor, Director, Movie.actors.through)
+
+
+def normalize(text):
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+
+def _keys(label):
+    words = normalize(label).split()
+    return {' '.join(words[i:]) for i in range(len(words))}
+
+
+def _short_prefixes(label):
+    return {key[:length] for key in _keys(label) for length in range(1, SHORT_PREFIX + 1)}
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._keys = []
+        self._ranked = {}
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.stamp = None
+        self.checked = 0.0
+
+    def _add(self, kind, pk, label, rating, url):
+        entry_id = (kind, pk)
+        self._remove(entry_id)
+        self._entries[entry_id] = {'kind': kind, 'label': label, 'rating': rating, 'url': url}
+        for key in _keys(label):
+            insort(self._keys, (key, kind, pk))
+        for prefix in _short_prefixes(label):
+            insort(self._ranked.setdefault(prefix, []), (-rating, kind, pk))
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for key in _keys(entry['label']):
+            position = bisect_left(self._keys, (key, *entry_id))
+            if position < len(self._keys) and self._keys[position] == (key, *entry_id):
+                del self._keys[position]
+        for prefix in _short_prefixes(entry['label']):
+            ranked = self._ranked[prefix]
+            del ranked[bisect_left(ranked, (-entry['rating'], *entry_id))]
+            if not ranked:
+                del self._ranked[prefix]
+
+    def load(self, stamp=None):
+        stamp = stamp or version_stamp(INDEXED_MODELS)[0]
+        entries = {}
+        keys = []
+        ranked = {}
+        for movie in Movie.objects.only('id', 'title', 'rating', 'date', 'slug').iterator(chunk_size=2000):
+            entries[('movie', movie.pk)] = {'kind': 'movie', 'label': str(movie), 'rating': movie.rating, 'url': movie.get_absolute_url()}
+        for kind, model in (('actor', Actor), ('director', Director)):
+            for person in model.objects.only('id', 'first_name', 'last_name', 'avg_rating').iterator(chunk_size=2000):
+                entries[(kind, person.pk)] = {'kind': kind, 'label': str(person), 'rating': person.avg_rating, 'url': person.get_absolute_url()}
+        for (kind, pk), entry in entries.items():
+            keys.extend((key, kind, pk) for key in _keys(entry['label']))
+            for prefix in _short_prefixes(entry['label']):
+                ranked.setdefault(prefix, []).append((-entry['rating'], kind, pk))
+        keys.sort()
+        for postings in ranked.values():
+            postings.sort()
+        with self._lock:
+            self._entries = entries
+            self._keys = keys
+            self._ranked = ranked
+            self.stamp = stamp
+            self.checked = time.monotonic()
+            self.loaded = True
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def ensure_current(self):
+        if self.loaded and time.monotonic() - self.checked < settings.AUTOCOMPLETE_RECHECK_SECONDS:
+            return
+        stamp = version_stamp(INDEXED_MODELS)[0]
+        self.checked = time.monotonic()
+        if not self.loaded or stamp != self.stamp:
+            self.load(stamp)
+
+    def add(self, kind, obj):
+        if not self.loaded:
+            return
+        rating = obj.rating if kind == 'movie' else obj.avg_rating
+        with self._lock:
+            self._add(kind, obj.pk, str(obj), rating, obj.get_absolute_url())
+
+    def remove(self, kind, pk):
+        if not self.loaded:
+            return
+        with self._lock:
+            self._remove((kind, pk))
+
+    def complete(self, prefix, limit=10):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        self.ensure_current()
+        with self._lock:
+            if len(prefix) <= SHORT_PREFIX:
+                return [self._entries[(kind, pk)] for _, kind, pk in self._ranked.get(prefix, [])[:limit]]
+            start = bisect_left(self._keys, (prefix,))
+            stop = bisect_left(self._keys, (prefix + '\uffff',), lo=start)
+            found = {(kind, pk) for _, kind, pk in self._keys[start:stop]}
+            entries = [self._entries[entry_id] for entry_id in found]
+        return heapq.nlargest(limit, entries, key=lambda entry: entry['rating'])
+
+
+prefix_index = PrefixIndex()
+
+
+def warm_prefix_index():
+    try:
+        prefix_index.ensure_loaded()
+    except DatabaseError:
+        pass
@@ -0,0 +1,93 @@
+import functools
+import hashlib
+
+from django.contrib import messages
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.functions import ExtractYear
+from django.views.decorators.http import condition
+
+from .counters import read_counters
+from .models import Actor, Director, Movie
+from .versions import version_stamp
+
+HOMEPAGE_CACHE_KEY = 'imdb:homepage'
+HOMEPAGE_CACHE_TIMEOUT = 60 * 15
+STATISTICS_CACHE_KEY = 'imdb:statistics'
+STATISTICS_CACHE_TIMEOUT = 60 * 60
+VIEW_CACHE_TIMEOUT = 60 * 5
+HOMEPAGE_MODELS = (Movie, Actor, Director, Movie.actors.through)
+
+
+def build_homepage_context():
+    return {
+        'top_movies': list(Movie.objects.order_by('-rating')[:6]),
+        'top_actors_male': list(Actor.objects.filter(sex='M').order_by('-avg_rating')[:6]),
+        'top_actors_female': list(Actor.objects.filter(sex='F').order_by('-avg_rating')[:6]),
+        'top_directors': list(Director.objects.order_by('-avg_rating')[:6]),
+        'all_years': list(Movie.objects.values(year=ExtractYear('date')).annotate(num=Count('id')).order_by('year')),
+    }
+
+
+def get_homepage_context():
+    # keyed on the table versions rather than deleted by the signals: the default locmem cache is per process, and
+    # the rating refreshes and FastAPI writes send no signals, but every one of them bumps a version
+    key = f'{HOMEPAGE_CACHE_KEY}:{version_stamp(HOMEPAGE_MODELS)[0]}'
+    context = cache.get(key)
+    if context is None:
+        context = build_homepage_context()
+        cache.set(key, context, HOMEPAGE_CACHE_TIMEOUT)
+    return context
+
+
+def get_statistics():
+    statistics = cache.get(STATISTICS_CACHE_KEY)
+    if statistics is None:
+        statistics = read_counters()
+        cache.set(STATISTICS_CACHE_KEY, statistics, STATISTICS_CACHE_TIMEOUT)
+    return statistics
+
+
+def invalidate_statistics():
+    cache.delete(STATISTICS_CACHE_KEY)
+
+
+def is_public_get(request):
+    return request.method == 'GET' and not request.user.is_authenticated and not len(messages.get_messages(request))
+
+
+def cached_view(models, timeout=VIEW_CACHE_TIMEOUT):
+    # keyed on the table versions like the homepage, so ratings, FastAPI writes and other processes' writes all
+    # move the page to a fresh key
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not is_public_get(request):
+                return view(request, *args, **kwargs)
+            path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = f'imdb:view:{version_stamp(models)[0]}:{path}'
+            response = cache.get(key)
+            if response is not None:
+                return response
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+            if response.status_code == 200 and not response.cookies and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+                cache.set(key, response, timeout)
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_view(models):
+    # ETag and Last-Modified come from the table versions alone, so a matching If-None-Match is answered with a 304
+    # before the view runs. Accept is part of the ETag because DRF picks the renderer from it
+    def stamp(request):
+        if not hasattr(request, '_version_stamp'):
+            request._version_stamp = version_stamp(models, request.headers.get('Accept', '')) if is_public_get(request) else (None, None)
+        return request._version_stamp
+
+    return condition(
+        etag_func=lambda request, *args, **kwargs: stamp(request)[0],
+        last_modified_func=lambda request, *args, **kwargs: stamp(request)[1],
+    )
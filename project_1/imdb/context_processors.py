@@ -0,0 +1,46 @@
+from django.db.models import Value
+from django.utils.functional import cached_property
+
+from .models import Actor, Director, Movie, UserMovieRating
+
+
+class UserRelations:
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def _ids(self):
+        ids = {'watchlist_ids': set(), 'favourite_actor_ids': set(), 'favourite_director_ids': set(), 'rated_movie_ids': set()}
+        if not self.user.is_authenticated:
+            return ids
+        watchlist = (Movie.users_to_watch.through.objects.filter(user_id=self.user.pk)
+                     .annotate(kind=Value('watchlist_ids')).values_list('kind', 'movie_id'))
+        actors = (Actor.actors_by_user.through.objects.filter(user_id=self.user.pk)
+                  .annotate(kind=Value('favourite_actor_ids')).values_list('kind', 'actor_id'))
+        directors = (Director.directors_by_user.through.objects.filter(user_id=self.user.pk)
+                     .annotate(kind=Value('favourite_director_ids')).values_list('kind', 'director_id'))
+        rated = (UserMovieRating.objects.filter(user_id=self.user.pk).order_by()
+                 .annotate(kind=Value('rated_movie_ids')).values_list('kind', 'movie_id'))
+        for kind, pk in watchlist.union(actors, directors, rated, all=True):
+            ids[kind].add(pk)
+        return ids
+
+    @property
+    def watchlist_ids(self):
+        return self._ids['watchlist_ids']
+
+    @property
+    def favourite_actor_ids(self):
+        return self._ids['favourite_actor_ids']
+
+    @property
+    def favourite_director_ids(self):
+        return self._ids['favourite_director_ids']
+
+    @property
+    def rated_movie_ids(self):
+        return self._ids['rated_movie_ids']
+
+
+def user_relations(request):
+    return {'user_relations': UserRelations(request.user)}
@@ -0,0 +1,34 @@
+from django.db.models import F
+
+from .models import Actor, CatalogCounter, Director, Movie
+
+COUNTED_MODELS = {
+    'num_movies': Movie,
+    'num_actors': Actor,
+    'num_directors': Director,
+}
+
+
+def counter_name(model):
+    for name, counted_model in COUNTED_MODELS.items():
+        if counted_model is model:
+            return name
+    return None
+
+
+def increment_counter(name, delta=1):
+    return CatalogCounter.objects.filter(name=name).update(value=F('value') + delta)
+
+
+def reconcile_counters():
+    counters = {name: model.objects.count() for name, model in COUNTED_MODELS.items()}
+    for name, value in counters.items():
+        CatalogCounter.objects.update_or_create(name=name, defaults={'value': value})
+    return counters
+
+
+def read_counters():
+    counters = dict(CatalogCounter.objects.filter(name__in=COUNTED_MODELS).values_list('name', 'value'))
+    if len(counters) < len(COUNTED_MODELS):
+        counters = reconcile_counters()
+    return counters
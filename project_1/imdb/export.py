@@ -0,0 +1,72 @@
+import csv
+import json
+
+from django.db.models import Prefetch
+
+from .models import Actor, Genre, Movie
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+EXPORT_FIELDS = ['id', 'imdb_id', 'title', 'slug', 'date', 'rating', 'community_rating', 'director', 'actors', 'genres']
+
+CSV_SEPARATOR = '|'
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def export_queryset():
+    return (
+        Movie.objects
+        .select_related('director')
+        .only('id', 'imdb_id', 'title', 'slug', 'date', 'rating', 'rating_sum', 'rating_count', 'director__first_name', 'director__last_name')
+        .prefetch_related(
+            Prefetch('actors', queryset=Actor.objects.only('id', 'first_name', 'last_name')),
+            Prefetch('genres', queryset=Genre.objects.only('id', 'name')),
+        )
+        .order_by('id')
+    )
+
+
+def export_rows(queryset=None, chunk_size=1000):
+    if queryset is None:
+        queryset = export_queryset()
+    for movie in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            'id': movie.id,
+            'imdb_id': movie.imdb_id,
+            'title': movie.title,
+            'slug': movie.slug,
+            'date': movie.date.isoformat(),
+            'rating': movie.rating,
+            'community_rating': movie.community_rating,
+            'director': str(movie.director) if movie.director else None,
+            'actors': [str(actor) for actor in movie.actors.all()],
+            'genres': [genre.name for genre in movie.genres.all()],
+        }
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow([
+            CSV_SEPARATOR.join(row[field]) if isinstance(row[field], list) else row[field]
+            for field in EXPORT_FIELDS
+        ])
+
+
+def export_lines(export_format, rows):
+    if export_format == 'csv':
+        return csv_lines(rows)
+    return ndjson_lines(rows)
@@ -89,6 +89,7 @@ class SearchForm(Form):
         for field_name, field in self.fields.items():
             field.widget.attrs['class'] = 'form-control'
         self.fields['pattern'].label = ""
+        self.fields['pattern'].widget.attrs.update({'list': 'search-suggestions', 'autocomplete': 'off'})
 
 
 class UserRatingForm(ModelForm):
@@ -106,7 +107,7 @@ class SendMessageForm(ModelForm):
     def __init__(self, *args, **kwargs):
         user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
-        if user.is_authenticated:
+        if user is not None and user.is_authenticated:
             self.fields['addressee'].queryset = User.objects.exclude(id=user.id)
         for field_name, field in self.fields.items():
             field.widget.attrs['class'] = 'form-control'
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from imdb.recommender import NEIGHBOURS, RATING_DTYPE, RECOMMENDATIONS, USER_BATCH, item_neighbours, rating_matrix, recommender_available, score_users
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class Command(BaseCommand):
+    help = 'Measure recommender throughput on a synthetic zipf-distributed rating matrix (no database access)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ratings', type=int, default=3000000)
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--movies', type=int, default=50000)
+        parser.add_argument('--zipf', type=float, default=1.1)
+        parser.add_argument('--neighbours', type=int, default=NEIGHBOURS)
+        parser.add_argument('--recommendations', type=int, default=RECOMMENDATIONS)
+        parser.add_argument('--score-users', type=int, default=20000, help='number of users to score')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if not recommender_available():
+            raise CommandError('numpy and scipy are required to benchmark the recommender')
+        rng = np.random.default_rng(options['seed'])
+        popularity = 1.0 / np.arange(1, options['movies'] + 1) ** options['zipf']
+        ratings = np.zeros(options['ratings'], dtype=RATING_DTYPE)
+        ratings['user_id'] = rng.integers(1, options['users'] + 1, options['ratings'])
+        ratings['movie_id'] = rng.choice(options['movies'], options['ratings'], p=popularity / popularity.sum()) + 1
+        ratings['value'] = rng.integers(1, 11, options['ratings'])
+        _, first = np.unique(ratings['user_id'] * (options['movies'] + 1) + ratings['movie_id'], return_index=True)
+        ratings = ratings[first]
+
+        started = time.perf_counter()
+        matrix, user_ids, movie_ids = rating_matrix(ratings)
+        self.report('rating matrix', started, matrix.nnz, 'ratings')
+
+        started = time.perf_counter()
+        neighbours = item_neighbours(matrix, options['neighbours'])
+        self.report('item neighbours', started, matrix.shape[1], 'movies')
+
+        num_users = min(options['score_users'], matrix.shape[0])
+        started = time.perf_counter()
+        for start in range(0, num_users, USER_BATCH):
+            score_users(matrix[start:min(start + USER_BATCH, num_users)], neighbours, options['recommendations'])
+        self.report('score users', started, num_users, 'users')
+
+    def report(self, stage, started, count, unit):
+        seconds = time.perf_counter() - started
+        self.stdout.write(f'{stage:16} {count:>10} {unit:8} {seconds:8.2f}s {count / max(seconds, 1e-9):>12.0f} {unit}/s')
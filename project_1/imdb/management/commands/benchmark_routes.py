@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+
+from imdb.models import Genre, Message, Movie, MovieComment
+from imdb.querybudget import FOLLOWED_ROUTES, ROUTE_BUDGETS, request_route, route_url
+from imdb.urls import urlpatterns
+
+
+class Command(BaseCommand):
+    help = 'Request every GET route with a query budget as a logged-in user and report queries and timings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='user to log in as (defaults to the first user)')
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        user = users.filter(username=options['username']).first() if options['username'] else users.first()
+        movie = Movie.objects.filter(actors__isnull=False).select_related('director').first()
+        if user is None or movie is None:
+            raise CommandError('The catalog needs at least one user and one movie with actors, run seed_catalog first')
+
+        client = Client(HTTP_HOST='localhost')
+        self.stdout.write(f'{"route":50} {"status":>6} {"queries":>7} {"budget":>6} {"sql ms":>8} {"wall ms":>8}')
+        # comments, messages and lists the routes need are created inside the transaction and rolled back with it
+        with transaction.atomic():
+            fixtures = SimpleNamespace(
+                user=user, movie=movie, actor=movie.actors.first(), director=movie.director,
+                genre=Genre.objects.filter(movies__isnull=False).first(),
+                comment=MovieComment.objects.create(movie=movie, author=user, text='benchmark'),
+                message=Message.objects.create(author=user, addressee=user, text='benchmark'),
+                movie_list=user.lists.first() or user.lists.create(name='benchmark'),
+            )
+            for pattern in urlpatterns:
+                route = str(pattern.pattern)
+                if route not in ROUTE_BUDGETS or ROUTE_BUDGETS[route][0] != 'get':
+                    continue
+                cache.clear()
+                client.force_login(user)
+                response, queries, wall_time = request_route(client, 'get', route_url(pattern, fixtures), follow=route in FOLLOWED_ROUTES)
+                budget = ROUTE_BUDGETS[route][3]
+                line = f'{route:50} {response.status_code:>6} {queries.count:>7} {budget:>6} {queries.time * 1000:>8.1f} {wall_time * 1000:>8.1f}'
+                self.stdout.write(self.style.ERROR(line) if queries.count > budget else line)
+            transaction.set_rollback(True)
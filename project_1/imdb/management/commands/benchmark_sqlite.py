@@ -0,0 +1,109 @@
+import datetime
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from imdb.sqlite import apply_pragmas
+
+LIST_SQL = 'SELECT id, title, slug, rating, date FROM imdb_movie ORDER BY date DESC, id DESC LIMIT 20'
+DETAIL_SQL = 'SELECT id, title, slug, rating, date, plot, director_id FROM imdb_movie WHERE id = ?'
+COMMENTS_SQL = 'SELECT id, text, author_id, created FROM imdb_moviecomment WHERE movie_id = ? ORDER BY created DESC'
+COMMENT_SQL = 'INSERT INTO imdb_moviecomment (text, author_id, movie_id, created, updated) VALUES (?, ?, ?, ?, ?)'
+RATING_SQL = 'UPDATE imdb_movie SET rating_sum = rating_sum + ?, rating_count = rating_count + 1 WHERE id = ?'
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Compare SQLite read/write throughput under concurrent load for each connection profile (runs on a copy of the database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', default=['default', 'tuned'], choices=sorted(settings.SQLITE_PROFILES))
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=10.0)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('the default database is not SQLite')
+        connection.ensure_connection()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.stdout.write(f'{"profile":10} {"reads/s":>10} {"writes/s":>10} {"read p50":>10} {"read p95":>10} {"write p95":>10} {"errors":>7}')
+            for profile in options['profiles']:
+                path = os.path.join(tmp_dir, f'{profile}.sqlite3')
+                pragmas = settings.SQLITE_PROFILES[profile]
+                self.copy_database(path, pragmas)
+                reads, writes = self.run(path, pragmas, options)
+                self.report(profile, reads, writes, options['seconds'])
+
+    def copy_database(self, path, pragmas):
+        target = sqlite3.connect(path)
+        connection.connection.backup(target)
+        target.execute(f'PRAGMA journal_mode = {pragmas.get("journal_mode", "delete")}')
+        self.movie_ids = [row[0] for row in target.execute('SELECT id FROM imdb_movie')]
+        self.user_ids = [row[0] for row in target.execute('SELECT id FROM auth_user')]
+        target.close()
+        if not self.movie_ids or not self.user_ids:
+            raise CommandError('the benchmark needs at least one movie and one user, run seed_catalog first')
+
+    def run(self, path, pragmas, options):
+        deadline = time.perf_counter() + options['seconds']
+        reads, writes = [], []
+        threads = [threading.Thread(target=self.worker, args=(path, pragmas, self.read, deadline, reads)) for _ in range(options['readers'])]
+        threads += [threading.Thread(target=self.worker, args=(path, pragmas, self.write, deadline, writes)) for _ in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return reads, writes
+
+    def worker(self, path, pragmas, operation, deadline, results):
+        db = sqlite3.connect(path, isolation_level=None)
+        apply_pragmas(db, pragmas)
+        rnd = random.Random()
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                operation(db, rnd)
+            except sqlite3.OperationalError:
+                if db.in_transaction:
+                    db.execute('ROLLBACK')
+                results.append(None)
+            else:
+                results.append(time.perf_counter() - started)
+        db.close()
+
+    def read(self, db, rnd):
+        movie_id = rnd.choice(self.movie_ids)
+        db.execute(LIST_SQL).fetchall()
+        db.execute(DETAIL_SQL, [movie_id]).fetchone()
+        db.execute(COMMENTS_SQL, [movie_id]).fetchall()
+
+    def write(self, db, rnd):
+        movie_id = rnd.choice(self.movie_ids)
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        db.execute('BEGIN IMMEDIATE')
+        db.execute(COMMENT_SQL, ['benchmark comment', rnd.choice(self.user_ids), movie_id, now, now])
+        db.execute(RATING_SQL, [rnd.randint(1, 10), movie_id])
+        db.execute('COMMIT')
+
+    def report(self, profile, reads, writes, seconds):
+        errors = reads.count(None) + writes.count(None)
+        reads = [latency for latency in reads if latency is not None]
+        writes = [latency for latency in writes if latency is not None]
+        self.stdout.write(
+            f'{profile:10} {len(reads) / seconds:10.0f} {len(writes) / seconds:10.0f} '
+            f'{percentile(reads, 0.5) * 1000:8.2f}ms {percentile(reads, 0.95) * 1000:8.2f}ms {percentile(writes, 0.95) * 1000:8.2f}ms {errors:7}'
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from imdb.similarity import rebuild_similar_movies
+
+
+class Command(BaseCommand):
+    help = 'Recompute the "similar movies" neighbour table (only stale movies unless --all is given)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='recompute every movie, not only the stale ones')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        num_movies = rebuild_similar_movies(stale_only=not options['all'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Refreshed neighbours of {num_movies} movies'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from imdb.export import EXPORT_FORMATS, export_lines, export_rows
+
+
+class Command(BaseCommand):
+    help = 'Stream the movie catalog with directors, actors and genres as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='ndjson')
+        parser.add_argument('--output', help='File to write to, stdout by default')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rows = export_rows(chunk_size=options['chunk_size'])
+        lines = export_lines(options['format'], rows)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                num_lines = sum(output.write(line) > 0 for line in lines)
+            self.stderr.write(self.style.SUCCESS(f'Exported {num_lines} lines to {options["output"]}'))
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,283 @@
+import csv
+import datetime
+import gzip
+import json
+import os
+import time
+from array import array
+from bisect import bisect_left
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils.text import slugify
+
+from imdb.counters import reconcile_counters
+from imdb.models import Actor, Director, Genre, Movie
+from imdb.search import rebuild_index
+from imdb.similarity import rebuild_similar_movies
+from imdb.stats import refresh_actor_stats, refresh_director_stats
+from imdb.versions import VERSIONED_MODELS, bump_versions
+
+DUMPS = {
+    'basics': 'title.basics.tsv',
+    'ratings': 'title.ratings.tsv',
+    'names': 'name.basics.tsv',
+    'principals': 'title.principals.tsv',
+}
+STAGES = ['movies', 'ratings', 'people', 'credits', 'finalize']
+ACTOR_CATEGORIES = {'actor': 'M', 'actress': 'F'}
+DIRECTOR_CATEGORY = 'director'
+
+
+def imdb_number(imdb_id):
+    return int(imdb_id[2:])
+
+
+def read_dump(path, skip=0):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as dump:
+        reader = csv.reader(dump, delimiter='\t', quoting=csv.QUOTE_NONE)
+        header = next(reader)
+        for line_number, values in enumerate(reader, start=1):
+            if line_number <= skip:
+                continue
+            yield line_number, dict(zip(header, (None if value == '\\N' else value for value in values)))
+
+
+class IdLookup:
+    def __init__(self, model):
+        keys, values = array('q'), array('q')
+        for imdb_id, pk in model.objects.exclude(imdb_id='').values_list('imdb_id', 'id').iterator(chunk_size=10000):
+            keys.append(imdb_number(imdb_id))
+            values.append(pk)
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.keys = array('q', (keys[i] for i in order))
+        self.values = array('q', (values[i] for i in order))
+
+    def get(self, imdb_id):
+        if not imdb_id:
+            return None
+        key = imdb_number(imdb_id)
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            return self.values[position]
+        return None
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class Command(BaseCommand):
+    help = 'Import the public IMDb TSV dumps (title.basics, title.ratings, name.basics, title.principals) keyed on imdb_id'
+
+    def add_arguments(self, parser):
+        parser.add_argument('data_dir', help='directory with the .tsv or .tsv.gz dumps')
+        parser.add_argument('--title-types', default='movie', help='comma separated titleType values to import')
+        parser.add_argument('--include-adult', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--checkpoint', default=None, help='defaults to <data_dir>/.import_imdb.json')
+        parser.add_argument('--restart', action='store_true', help='ignore an existing checkpoint')
+        parser.add_argument('--skip-index', action='store_true', help='do not rebuild the search index')
+
+    def handle(self, *args, **options):
+        self.data_dir = options['data_dir']
+        self.batch_size = options['batch_size']
+        self.title_types = set(options['title_types'].split(','))
+        self.include_adult = options['include_adult']
+        self.skip_index = options['skip_index']
+        self.checkpoint_path = options['checkpoint'] or os.path.join(self.data_dir, '.import_imdb.json')
+        self.started = time.perf_counter()
+        if not self.dump_path('basics'):
+            raise CommandError(f'{DUMPS["basics"]} not found in {self.data_dir}')
+
+        checkpoint = {'stage': STAGES[0], 'line': 0}
+        if not options['restart'] and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as checkpoint_file:
+                checkpoint = json.load(checkpoint_file)
+            self.stdout.write(f'Resuming at stage {checkpoint["stage"]}, line {checkpoint["line"]}')
+
+        for stage in STAGES[STAGES.index(checkpoint['stage']):]:
+            skip = checkpoint['line'] if stage == checkpoint['stage'] else 0
+            self.save_checkpoint(stage, skip)
+            getattr(self, f'import_{stage}')(skip)
+        os.remove(self.checkpoint_path)
+        self.stdout.write(self.style.SUCCESS(f'IMDb dumps imported in {time.perf_counter() - self.started:.1f}s'))
+
+    def dump_path(self, name):
+        for path in (os.path.join(self.data_dir, DUMPS[name] + '.gz'), os.path.join(self.data_dir, DUMPS[name])):
+            if os.path.exists(path):
+                return path
+        return None
+
+    def save_checkpoint(self, stage, line):
+        with open(self.checkpoint_path + '.tmp', 'w') as checkpoint_file:
+            json.dump({'stage': stage, 'line': line}, checkpoint_file)
+        os.replace(self.checkpoint_path + '.tmp', self.checkpoint_path)
+
+    def log(self, message):
+        self.stdout.write(f'{message} ({time.perf_counter() - self.started:.1f}s)')
+
+    def batches(self, stage, rows, key=None):
+        batch = []
+        line_number = previous_key = None
+        for line_number, row in rows:
+            current_key = key(row) if key else None
+            if len(batch) >= self.batch_size and (key is None or current_key != previous_key):
+                yield batch
+                self.save_checkpoint(stage, line_number - 1)
+                batch = []
+            batch.append(row)
+            previous_key = current_key
+        if batch:
+            yield batch
+            self.save_checkpoint(stage, line_number)
+
+    def upsert(self, model, objects, fields):
+        existing = dict(model.objects.filter(imdb_id__in=[obj.imdb_id for obj in objects]).values_list('imdb_id', 'id'))
+        new_objects = [obj for obj in objects if obj.imdb_id not in existing]
+        old_objects = [obj for obj in objects if obj.imdb_id in existing]
+        for obj in old_objects:
+            obj.pk = existing[obj.imdb_id]
+        model.objects.bulk_create(new_objects)
+        if old_objects:
+            model.objects.bulk_update(old_objects, fields, batch_size=1000)
+        return objects
+
+    def import_movies(self, skip):
+        genre_ids = dict(Genre.objects.values_list('name', 'id'))
+        num_movies = 0
+        rows = (
+            (line_number, row) for line_number, row in read_dump(self.dump_path('basics'), skip)
+            if row['titleType'] in self.title_types and row['startYear'] and (self.include_adult or row['isAdult'] != '1')
+        )
+        for batch in self.batches('movies', rows):
+            movies = [
+                Movie(
+                    imdb_id=row['tconst'],
+                    title=row['primaryTitle'][:100],
+                    slug=f'{slugify(row["primaryTitle"])[:38].strip("-")}-{row["tconst"]}'.lstrip('-'),
+                    date=datetime.date(int(row['startYear']), 1, 1),
+                    poster='movie_posters/placeholder.jpg',
+                )
+                for row in batch
+            ]
+            with transaction.atomic():
+                self.upsert(Movie, movies, ['title', 'date'])
+                links = []
+                for movie, row in zip(movies, batch):
+                    for name in (row['genres'] or '').split(','):
+                        if name and name not in genre_ids:
+                            genre_ids[name] = Genre.objects.get_or_create(name=name)[0].pk
+                        if name:
+                            links.append(Movie.genres.through(movie_id=movie.pk, genre_id=genre_ids[name]))
+                Movie.genres.through.objects.bulk_create(links, ignore_conflicts=True)
+            num_movies += len(movies)
+        self.log(f'Movies: {num_movies} rows')
+
+    def import_ratings(self, skip):
+        if not self.dump_path('ratings'):
+            self.stdout.write(self.style.WARNING(f'{DUMPS["ratings"]} not found, skipping ratings'))
+            return
+        movies = IdLookup(Movie)
+        table = connection.ops.quote_name(Movie._meta.db_table)
+        num_ratings = 0
+        rows = ((line_number, row) for line_number, row in read_dump(self.dump_path('ratings'), skip) if movies.get(row['tconst']))
+        for batch in self.batches('ratings', rows):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(
+                    f'UPDATE {table} SET rating = %s WHERE id = %s',
+                    [(float(row['averageRating']), movies.get(row['tconst'])) for row in batch]
+                )
+            num_ratings += len(batch)
+        self.log(f'Ratings: {num_ratings} rows')
+
+    def credited_people(self, movies):
+        actors, directors = {}, set()
+        for _, row in read_dump(self.dump_path('principals')):
+            category = row['category']
+            if (category in ACTOR_CATEGORIES or category == DIRECTOR_CATEGORY) and movies.get(row['tconst']):
+                if category == DIRECTOR_CATEGORY:
+                    directors.add(imdb_number(row['nconst']))
+                else:
+                    actors[imdb_number(row['nconst'])] = ACTOR_CATEGORIES[category]
+        return actors, directors
+
+    def import_people(self, skip):
+        if not self.dump_path('names') or not self.dump_path('principals'):
+            self.stdout.write(self.style.WARNING(f'{DUMPS["names"]} or {DUMPS["principals"]} not found, skipping people'))
+            return
+        actors, directors = self.credited_people(IdLookup(Movie))
+        self.log(f'Credited people: {len(actors)} actors, {len(directors)} directors')
+        num_actors = num_directors = 0
+        rows = (
+            (line_number, row) for line_number, row in read_dump(self.dump_path('names'), skip)
+            if imdb_number(row['nconst']) in actors or imdb_number(row['nconst']) in directors
+        )
+        for batch in self.batches('people', rows):
+            new_actors, new_directors = [], []
+            for row in batch:
+                *first_names, last_name = (row['primaryName'] or '').split() or ['']
+                person = {
+                    'imdb_id': row['nconst'],
+                    'first_name': ' '.join(first_names)[:25],
+                    'last_name': last_name[:25],
+                    'birth_date': datetime.date(int(row['birthYear']), 1, 1) if row['birthYear'] else None,
+                }
+                number = imdb_number(row['nconst'])
+                if number in actors:
+                    new_actors.append(Actor(sex=actors[number], photo='actor_imgs/placeholder.jpg', **person))
+                if number in directors:
+                    new_directors.append(Director(photo='director_imgs/placeholder.jpg', **person))
+            with transaction.atomic():
+                self.upsert(Actor, new_actors, ['first_name', 'last_name', 'birth_date', 'sex'])
+                self.upsert(Director, new_directors, ['first_name', 'last_name', 'birth_date'])
+            num_actors += len(new_actors)
+            num_directors += len(new_directors)
+        self.log(f'People: {num_actors} actors, {num_directors} directors')
+
+    def import_credits(self, skip):
+        if not self.dump_path('principals'):
+            return
+        movies, actors, directors = IdLookup(Movie), IdLookup(Actor), IdLookup(Director)
+        table = connection.ops.quote_name(Movie._meta.db_table)
+        num_links = num_directors = 0
+        rows = (
+            (line_number, row) for line_number, row in read_dump(self.dump_path('principals'), skip)
+            if row['category'] in ACTOR_CATEGORIES or row['category'] == DIRECTOR_CATEGORY
+        )
+        for batch in self.batches('credits', rows, key=lambda row: row['tconst']):
+            links, movie_directors = [], {}
+            for row in batch:
+                movie_id = movies.get(row['tconst'])
+                if not movie_id:
+                    continue
+                if row['category'] == DIRECTOR_CATEGORY:
+                    director_id = directors.get(row['nconst'])
+                    if director_id:
+                        movie_directors.setdefault(movie_id, director_id)
+                else:
+                    actor_id = actors.get(row['nconst'])
+                    if actor_id:
+                        links.append(Movie.actors.through(movie_id=movie_id, actor_id=actor_id))
+            with transaction.atomic():
+                Movie.actors.through.objects.bulk_create(links, ignore_conflicts=True)
+                with connection.cursor() as cursor:
+                    cursor.executemany(
+                        f'UPDATE {table} SET director_id = %s WHERE id = %s',
+                        [(director_id, movie_id) for movie_id, director_id in movie_directors.items()]
+                    )
+            num_links += len(links)
+            num_directors += len(movie_directors)
+        self.log(f'Credits: {num_links} actor links, {num_directors} directed movies')
+
+    def import_finalize(self, skip):
+        refresh_actor_stats()
+        refresh_director_stats()
+        reconcile_counters()
+        bump_versions(*VERSIONED_MODELS)
+        if not self.skip_index:
+            rebuild_index()
+        rebuild_similar_movies()
+        cache.clear()
+        self.log('Statistics refreshed')
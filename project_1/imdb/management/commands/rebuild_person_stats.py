@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from imdb.stats import refresh_actor_stats, refresh_director_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild denormalized avg_rating / num_movies columns of actors and directors'
+
+    def handle(self, *args, **options):
+        num_actors = refresh_actor_stats()
+        num_directors = refresh_director_stats()
+        self.stdout.write(self.style.SUCCESS(f'Updated {num_actors} actors and {num_directors} directors'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from imdb.search import fts_enabled, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of movies, actors and directors'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if not fts_enabled():
+            self.stdout.write(self.style.WARNING('Full-text index is only available on SQLite, nothing to do'))
+            return
+        num_rows = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {num_rows} objects'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from imdb.cache import invalidate_statistics
+from imdb.counters import read_counters, reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount movies, actors and directors and fix drift in the catalog counters'
+
+    def handle(self, *args, **options):
+        stored = read_counters()
+        counters = reconcile_counters()
+        invalidate_statistics()
+        for name, value in counters.items():
+            drift = value - stored.get(name, 0)
+            self.stdout.write(f'{name}: {value}' + (f' (drift {drift:+d})' if drift else ''))
@@ -0,0 +1,189 @@
+import datetime
+import itertools
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from imdb.counters import reconcile_counters
+from imdb.models import *
+from imdb.search import rebuild_index
+from imdb.similarity import rebuild_similar_movies
+from imdb.stats import refresh_actor_stats, refresh_director_stats, refresh_movie_rating_stats
+from imdb.versions import VERSIONED_MODELS, bump_versions
+
+WORDS = [
+    'dark', 'night', 'love', 'last', 'city', 'blood', 'star', 'king', 'dream', 'war', 'secret', 'house', 'road', 'fire',
+    'ghost', 'lost', 'river', 'storm', 'silent', 'wild', 'golden', 'broken', 'shadow', 'heart', 'iron', 'summer',
+    'winter', 'empire', 'world', 'legend', 'return', 'escape', 'code', 'island', 'mission', 'garden', 'machine', 'song',
+]
+FIRST_NAMES = ['James', 'Mary', 'John', 'Anna', 'Robert', 'Linda', 'Michael', 'Emma', 'David', 'Sofia', 'Daniel', 'Olga', 'Paul', 'Nina', 'Mark', 'Eva']
+LAST_NAMES = ['Smith', 'Brown', 'Miller', 'Davis', 'Wilson', 'Moore', 'Taylor', 'Clark', 'Lewis', 'Walker', 'Young', 'King', 'Scott', 'Green', 'Baker', 'Hill']
+
+
+class ZipfSampler:
+    def __init__(self, population, exponent, rnd):
+        self.population = population
+        self.rnd = rnd
+        self.cum_weights = list(itertools.accumulate(1.0 / rank ** exponent for rank in range(1, len(population) + 1)))
+
+    def sample(self, k):
+        k = min(k, len(self.population))
+        chosen = set()
+        while len(chosen) < k:
+            chosen.update(self.rnd.choices(self.population, cum_weights=self.cum_weights, k=k - len(chosen)))
+        return chosen
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generate a synthetic catalog (movies, people, users and their relations) for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=10000)
+        parser.add_argument('--actors', type=int, default=None, help='defaults to movies / 2')
+        parser.add_argument('--directors', type=int, default=None, help='defaults to movies / 20')
+        parser.add_argument('--genres', type=int, default=25)
+        parser.add_argument('--users', type=int, default=None, help='defaults to movies / 10')
+        parser.add_argument('--actors-per-movie', type=int, default=6)
+        parser.add_argument('--ratings-per-user', type=int, default=30)
+        parser.add_argument('--watchlist-per-user', type=int, default=10)
+        parser.add_argument('--lists-per-user', type=int, default=1)
+        parser.add_argument('--zipf', type=float, default=1.1, help='exponent of the popularity distribution')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--skip-index', action='store_true', help='do not rebuild the search index')
+        parser.add_argument('--skip-similar', action='store_true', help='leave every movie stale for build_similar_movies')
+
+    def handle(self, *args, **options):
+        self.rnd = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        num_movies = options['movies']
+        num_actors = options['actors'] or max(num_movies // 2, 1)
+        num_directors = options['directors'] or max(num_movies // 20, 1)
+        num_users = options['users'] or max(num_movies // 10, 1)
+        zipf = options['zipf']
+        self.started = time.perf_counter()
+        run_id = self.rnd.randrange(16 ** 6)
+
+        genre_ids = self.create(Genre, (Genre(name=f'{self.rnd.choice(WORDS).title()} {i}') for i in range(options['genres'])))
+        director_ids = self.create(Director, (self.person(Director) for _ in range(num_directors)))
+        actor_ids = self.create(Actor, (self.person(Actor) for _ in range(num_actors)))
+        directors = ZipfSampler(director_ids, zipf, self.rnd)
+        movie_ids = self.create(Movie, (self.movie(i, run_id, directors) for i in range(num_movies)))
+
+        password = make_password('password')
+        user_ids = self.create(User, (
+            User(username=f'seed_{run_id:06x}_{i}', password=password, first_name=self.rnd.choice(FIRST_NAMES), last_name=self.rnd.choice(LAST_NAMES))
+            for i in range(num_users)
+        ))
+        self.create(Profile, (Profile(user_id=user_id, img='user_imgs/user.jpg') for user_id in user_ids))
+
+        actors = ZipfSampler(actor_ids, zipf, self.rnd)
+        genres = ZipfSampler(genre_ids, zipf, self.rnd)
+        movies = ZipfSampler(movie_ids, zipf, self.rnd)
+        self.insert_rows(Movie.actors.through, ('movie_id', 'actor_id'), (
+            (movie_id, actor_id)
+            for movie_id in movie_ids for actor_id in actors.sample(self.rnd.randint(1, options['actors_per_movie'] * 2 - 1))
+        ))
+        self.insert_rows(Movie.genres.through, ('movie_id', 'genre_id'), (
+            (movie_id, genre_id)
+            for movie_id in movie_ids for genre_id in genres.sample(self.rnd.randint(1, 3))
+        ))
+        self.insert_rows(Movie.users_to_watch.through, ('user_id', 'movie_id'), (
+            (user_id, movie_id)
+            for user_id in user_ids for movie_id in movies.sample(self.rnd.randint(0, options['watchlist_per_user'] * 2))
+        ))
+        self.insert_rows(Actor.actors_by_user.through, ('user_id', 'actor_id'), (
+            (user_id, actor_id)
+            for user_id in user_ids for actor_id in actors.sample(self.rnd.randint(0, 5))
+        ))
+        self.insert_rows(Director.directors_by_user.through, ('user_id', 'director_id'), (
+            (user_id, director_id)
+            for user_id in user_ids for director_id in directors.sample(self.rnd.randint(0, 3))
+        ))
+        created = connection.ops.adapt_datetimefield_value(timezone.now())
+        self.insert_rows(UserMovieRating, ('user_id', 'movie_id', 'value', 'created', 'updated'), (
+            (user_id, movie_id, self.rnd.randint(1, 10), created, created)
+            for user_id in user_ids
+            for movie_id in movies.sample(int(self.rnd.expovariate(1 / options['ratings_per_user'])))
+        ))
+        list_ids = self.create(PersonalMovieList, (
+            PersonalMovieList(user_id=user_id, name=f'{self.rnd.choice(WORDS).title()} list')
+            for user_id in user_ids for _ in range(options['lists_per_user'])
+        ))
+        self.insert_rows(PersonalMovieList.movies.through, ('personalmovielist_id', 'movie_id'), (
+            (list_id, movie_id)
+            for list_id in list_ids for movie_id in movies.sample(self.rnd.randint(1, 20))
+        ))
+
+        self.stdout.write('Refreshing denormalized statistics...')
+        refresh_movie_rating_stats()
+        refresh_actor_stats()
+        refresh_director_stats()
+        reconcile_counters()
+        bump_versions(*VERSIONED_MODELS)
+        if not options['skip_index']:
+            self.stdout.write('Rebuilding search index...')
+            self.timed('Search index', 'rows', rebuild_index)
+        if not options['skip_similar']:
+            self.stdout.write('Computing similar movies...')
+            self.timed('Similar movies', 'movies', rebuild_similar_movies, stale_only=False)
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS(f'Catalog seeded in {time.perf_counter() - self.started:.1f}s'))
+
+    def timed(self, label, unit, func, *args, **kwargs):
+        started = time.perf_counter()
+        num = func(*args, **kwargs)
+        self.stdout.write(f'{label}: {num} {unit} in {time.perf_counter() - started:.1f}s ({time.perf_counter() - self.started:.1f}s)')
+
+    def create(self, model, objects):
+        ids = []
+        num_rows = 0
+        for batch in batched(objects, self.batch_size):
+            with transaction.atomic():
+                created = model.objects.bulk_create(batch, batch_size=self.batch_size)
+            ids.extend(obj.pk for obj in created)
+            num_rows += len(batch)
+        self.stdout.write(f'{model._meta.label}: {num_rows} rows ({time.perf_counter() - self.started:.1f}s)')
+        return ids
+
+    def insert_rows(self, model, columns, rows):
+        table = connection.ops.quote_name(model._meta.db_table)
+        sql = f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join(["%s"] * len(columns))})'
+        num_rows = 0
+        for batch in batched(rows, self.batch_size):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, batch)
+            num_rows += len(batch)
+        self.stdout.write(f'{model._meta.label}: {num_rows} rows ({time.perf_counter() - self.started:.1f}s)')
+
+    def person(self, model):
+        folder = 'actor_imgs' if model is Actor else 'director_imgs'
+        return model(
+            first_name=self.rnd.choice(FIRST_NAMES),
+            last_name=self.rnd.choice(LAST_NAMES),
+            birth_date=datetime.date(self.rnd.randint(1930, 2005), self.rnd.randint(1, 12), self.rnd.randint(1, 28)),
+            sex=self.rnd.choice('MF'),
+            photo=f'{folder}/placeholder.jpg',
+        )
+
+    def movie(self, number, run_id, directors):
+        title = ' '.join(self.rnd.sample(WORDS, self.rnd.randint(1, 4))).title()
+        return Movie(
+            title=title,
+            slug=f'seed-{run_id:06x}-{number}',
+            rating=round(min(max(self.rnd.gauss(6.5, 1.5), 1.0), 10.0), 1),
+            date=datetime.date(self.rnd.randint(1920, 2025), self.rnd.randint(1, 12), self.rnd.randint(1, 28)),
+            director_id=next(iter(directors.sample(1))),
+            poster='movie_posters/placeholder.jpg',
+        )
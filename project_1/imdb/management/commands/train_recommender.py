@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from imdb.recommender import NEIGHBOURS, RECOMMENDATIONS, recommender_available, train, update_users
+
+
+class Command(BaseCommand):
+    help = 'Train the item-item collaborative filtering model and store top-k recommendations per user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true', help='only refresh users who rated movies since the last training')
+        parser.add_argument('--user', type=int, action='append', dest='users', help='refresh the given user id with the stored model')
+        parser.add_argument('--neighbours', type=int, default=NEIGHBOURS)
+        parser.add_argument('--recommendations', type=int, default=RECOMMENDATIONS)
+
+    def handle(self, *args, **options):
+        if not recommender_available():
+            raise CommandError('numpy and scipy are required to train the recommender')
+        if options['incremental'] or options['users']:
+            try:
+                num_users = update_users(options['users'], k=options['recommendations'])
+            except FileNotFoundError:
+                raise CommandError('No trained model found, run train_recommender without --incremental first')
+            self.stdout.write(self.style.SUCCESS(f'Refreshed recommendations of {num_users} users'))
+            return
+        num_ratings, num_users, timings = train(options['neighbours'], options['recommendations'])
+        total = sum(timings.values())
+        self.stdout.write(', '.join(f'{stage} {seconds:.1f}s' for stage, seconds in timings.items()))
+        self.stdout.write(self.style.SUCCESS(
+            f'Trained on {num_ratings} ratings of {num_users} users in {total:.1f}s ({num_ratings / max(total, 1e-9):.0f} ratings/s)'
+        ))
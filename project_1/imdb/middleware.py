@@ -0,0 +1,24 @@
+from django.conf import settings
+
+from .routers import read_from_primary, wrote_to_primary
+
+PRIMARY_COOKIE = 'imdb_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        read_token = read_from_primary.set(request.method not in SAFE_METHODS or PRIMARY_COOKIE in request.COOKIES)
+        wrote_token = wrote_to_primary.set(False)
+        try:
+            response = self.get_response(request)
+            if wrote_to_primary.get() and settings.DATABASE_REPLICAS:
+                # replicas may lag, keep this client's reads on the primary until they have caught up
+                response.set_cookie(PRIMARY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax')
+        finally:
+            read_from_primary.reset(read_token)
+            wrote_to_primary.reset(wrote_token)
+        return response
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:38
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_person_stats(apps, schema_editor):
+    Movie = apps.get_model('imdb', 'Movie')
+    for model_name, related_field in (('Actor', 'actors'), ('Director', 'director')):
+        movies = Movie.objects.filter(**{related_field: OuterRef('pk')}).order_by().values(related_field)
+        apps.get_model('imdb', model_name).objects.update(
+            avg_rating=Coalesce(Subquery(movies.annotate(value=Avg('rating')).values('value')), Value(0.0)),
+            num_movies=Coalesce(Subquery(movies.annotate(value=Count('id')).values('value'), output_field=IntegerField()), Value(0)),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imdb', '0023_movie_imdb_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actor',
+            name='avg_rating',
+            field=models.FloatField(db_index=True, default=0.0),
+        ),
+        migrations.AddField(
+            model_name='actor',
+            name='num_movies',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='director',
+            name='avg_rating',
+            field=models.FloatField(db_index=True, default=0.0),
+        ),
+        migrations.AddField(
+            model_name='director',
+            name='num_movies',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_person_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:39
+
+from django.db import migrations, models
+from django.db.models import Count, FloatField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_community_rating(apps, schema_editor):
+    UserMovieRating = apps.get_model('imdb', 'UserMovieRating')
+    Movie = apps.get_model('imdb', 'Movie')
+    duplicates = UserMovieRating.objects.values('user_id', 'movie_id').annotate(num=Count('id')).filter(num__gt=1)
+    for item in duplicates:
+        rates = UserMovieRating.objects.filter(user_id=item['user_id'], movie_id=item['movie_id']).order_by('-created', '-id')
+        UserMovieRating.objects.filter(pk__in=list(rates.values_list('pk', flat=True)[1:])).delete()
+    ratings = UserMovieRating.objects.filter(movie=OuterRef('pk')).order_by().values('movie')
+    Movie.objects.update(
+        rating_sum=Coalesce(Subquery(ratings.annotate(value_sum=Sum('value')).values('value_sum'), output_field=FloatField()), Value(0.0)),
+        rating_count=Coalesce(Subquery(ratings.annotate(num=Count('id')).values('num'), output_field=IntegerField()), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imdb', '0024_person_rating_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_sum',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.RunPython(fill_community_rating, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations
+
+SEARCH_TABLE = 'imdb_search_index'
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+            title,
+            body,
+            kind UNINDEXED,
+            object_id UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """)
+    schema_editor.execute(f"""
+        INSERT INTO {SEARCH_TABLE} (rowid, title, body, kind, object_id)
+        SELECT id * 4 + 1, title, plot, 'movie', id FROM imdb_movie
+    """)
+    schema_editor.execute(f"""
+        INSERT INTO {SEARCH_TABLE} (rowid, title, body, kind, object_id)
+        SELECT id * 4 + 2, first_name || ' ' || last_name, '', 'actor', id FROM imdb_actor
+    """)
+    schema_editor.execute(f"""
+        INSERT INTO {SEARCH_TABLE} (rowid, title, body, kind, object_id)
+        SELECT id * 4 + 3, first_name || ' ' || last_name, '', 'director', id FROM imdb_director
+    """)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imdb', '0025_movie_community_rating'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
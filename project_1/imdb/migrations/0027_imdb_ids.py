@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imdb', '0026_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actor',
+            name='imdb_id',
+            field=models.CharField(blank=True, db_index=True, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='director',
+            name='imdb_id',
+            field=models.CharField(blank=True, db_index=True, max_length=12),
+        ),
+        migrations.AlterField(
+            model_name='actor',
+            name='birth_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='director',
+            name='birth_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='movie',
+            name='imdb_id',
+            field=models.CharField(blank=True, db_index=True, max_length=12),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imdb', '0027_imdb_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='similar_stale',
+            field=models.BooleanField(db_index=True, default=True),
+        ),
+        migrations.CreateModel(
+            name='SimilarMovie',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_movies', to='imdb.movie')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_to', to='imdb.movie')),
+            ],
+            options={
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['movie', '-score'], name='imdb_simila_movie_i_0af3b2_idx')],
+                'constraints': [models.UniqueConstraint(fields=('movie', 'similar'), name='unique_similar_movie')],
+            },
+        ),
+    ]
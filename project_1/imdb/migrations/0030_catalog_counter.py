@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:29
+
+from django.db import migrations, models
+
+
+def fill_counters(apps, schema_editor):
+    CatalogCounter = apps.get_model('imdb', 'CatalogCounter')
+    for name, model_name in (('num_movies', 'Movie'), ('num_actors', 'Actor'), ('num_directors', 'Director')):
+        CatalogCounter.objects.create(name=name, value=apps.get_model('imdb', model_name).objects.count())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imdb', '0029_movie_recommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogCounter',
+            fields=[
+                ('name', models.CharField(max_length=30, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:32
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def drop_duplicate_ratings(apps, schema_editor):
+    UserMovieRating = apps.get_model('imdb', 'UserMovieRating')
+    Movie = apps.get_model('imdb', 'Movie')
+    duplicates = UserMovieRating.objects.values('user_id', 'movie_id').annotate(num=Count('id')).filter(num__gt=1)
+    for item in duplicates:
+        rates = list(UserMovieRating.objects.filter(user_id=item['user_id'], movie_id=item['movie_id']).order_by('-created', '-id')[1:])
+        UserMovieRating.objects.filter(pk__in=[rate.pk for rate in rates]).delete()
+        Movie.objects.filter(pk=item['movie_id']).update(
+            rating_sum=F('rating_sum') - sum(rate.value for rate in rates), rating_count=F('rating_count') - len(rates),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imdb', '0030_catalog_counter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='message',
+            name='addressee',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='income_messages', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='moviecomment',
+            name='movie',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='imdb.movie'),
+        ),
+        migrations.AlterField(
+            model_name='usermovierating',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='movie_ratings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='actor',
+            index=models.Index(fields=['last_name', 'first_name', 'id'], name='actor_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actor',
+            index=models.Index(fields=['sex', '-avg_rating'], name='actor_sex_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='director',
+            index=models.Index(fields=['last_name', 'first_name', 'id'], name='director_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['addressee', 'is_read'], name='message_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['-created', '-id'], name='message_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['title'], name='movie_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(django.db.models.functions.text.Lower('title'), name='movie_title_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-date', '-id'], name='movie_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-rating'], name='movie_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moviecomment',
+            index=models.Index(fields=['movie', '-created'], name='moviecomment_movie_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='personalmovielist',
+            index=models.Index(fields=['-created', '-id'], name='personallist_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usermovierating',
+            index=models.Index(fields=['created'], name='usermovierating_created_idx'),
+        ),
+        migrations.RunPython(drop_duplicate_ratings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='usermovierating',
+            constraint=models.UniqueConstraint(fields=('user', 'movie'), name='unique_user_movie_rating'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:53
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_versions(apps, schema_editor):
+    TableVersion = apps.get_model('imdb', 'TableVersion')
+    Movie = apps.get_model('imdb', 'Movie')
+    versioned = [apps.get_model('imdb', name) for name in ('Movie', 'Actor', 'Director', 'Genre', 'MovieComment', 'ActorComment', 'DirectorComment', 'UserMovieRating', 'Profile')]
+    versioned += [Movie.actors.through, Movie.genres.through, Movie.users_to_watch.through]
+    now = timezone.now()
+    TableVersion.objects.bulk_create([TableVersion(name=model._meta.db_table, version=1, modified=now) for model in versioned])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imdb', '0031_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableVersion',
+            fields=[
+                ('name', models.CharField(max_length=63, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+                ('modified', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(fill_versions, migrations.RunPython.noop),
+    ]
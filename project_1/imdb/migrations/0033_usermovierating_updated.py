@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:30
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def copy_created(apps, schema_editor):
+    UserMovieRating = apps.get_model('imdb', 'UserMovieRating')
+    UserMovieRating.objects.update(updated=F('created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imdb', '0032_table_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usermovierating',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_created, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='usermovierating',
+            name='usermovierating_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='usermovierating',
+            index=models.Index(fields=['updated'], name='usermovierating_updated_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
@@ -16,10 +17,13 @@ sex_choises = [('M', 'Male'), ('F', 'Female')]
 class Actor(models.Model):
     first_name = models.CharField(max_length=25)
     last_name = models.CharField(max_length=25)
-    birth_date = models.DateField(blank=True)
+    birth_date = models.DateField(blank=True, null=True)
     photo = models.ImageField(upload_to='actor_imgs', blank=True)
     sex = models.CharField(max_length=1, choices=sex_choises, blank=True)
     actors_by_user = models.ManyToManyField(User, related_name='favourite_actors', blank=True)
+    imdb_id = models.CharField(max_length=12, blank=True, db_index=True)
+    avg_rating = models.FloatField(default=0.0, db_index=True)
+    num_movies = models.PositiveIntegerField(default=0)
 
     objects = models.Manager()
 
@@ -29,6 +33,12 @@ class Actor(models.Model):
     def get_absolute_url(self):
         return reverse("imdb:actor-detail", kwargs={"pk": self.id})
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_name', 'first_name', 'id'], name='actor_name_idx'),
+            models.Index(fields=['sex', '-avg_rating'], name='actor_sex_rating_idx'),
+        ]
+
 
 class Movie(models.Model):
     title = models.CharField(max_length=100)
@@ -43,13 +53,22 @@ class Movie(models.Model):
     users_to_watch = models.ManyToManyField(User, related_name='watchlist', blank=True)
     user_rated_this_movie = models.ManyToManyField(User, related_name='movies_rated_this_user',  through="UserMovieRating")
     genres = models.ManyToManyField('Genre', related_name='movies', blank=True)
-    imdb_id = models.CharField(max_length=12, blank=True)
+    imdb_id = models.CharField(max_length=12, blank=True, db_index=True)
+    rating_sum = models.FloatField(default=0.0)
+    rating_count = models.PositiveIntegerField(default=0)
+    similar_stale = models.BooleanField(default=True, db_index=True)
 
     objects = models.Manager()
 
     def __str__(self):
         return f'{self.title} ({self.date.year})'
 
+    @property
+    def community_rating(self):
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
     def get_absolute_url(self):
         return reverse("imdb:movie-detail", kwargs={"slug": self.slug})
         # return reverse('imdb:movie-detail', kwargs={"pk": self.id})
@@ -57,14 +76,25 @@ class Movie(models.Model):
     def genres_str(self):
         return ' '.join(self.genres.values_list('name', flat=True).order_by("name"))
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['title'], name='movie_title_idx'),
+            models.Index(Lower('title'), name='movie_title_lower_idx'),
+            models.Index(fields=['-date', '-id'], name='movie_date_idx'),
+            models.Index(fields=['-rating'], name='movie_rating_idx'),
+        ]
+
 
 class Director(models.Model):
     first_name = models.CharField(max_length=25)
     last_name = models.CharField(max_length=25)
-    birth_date = models.DateField(blank=True)
+    birth_date = models.DateField(blank=True, null=True)
     photo = models.ImageField(upload_to='director_imgs', blank=True)
     sex = models.CharField(max_length=1, choices=sex_choises, blank=True)
     directors_by_user = models.ManyToManyField(User, related_name='favourite_directors', blank=True)
+    imdb_id = models.CharField(max_length=12, blank=True, db_index=True)
+    avg_rating = models.FloatField(default=0.0, db_index=True)
+    num_movies = models.PositiveIntegerField(default=0)
 
     objects = models.Manager()
 
@@ -74,16 +104,59 @@ class Director(models.Model):
     def get_absolute_url(self):
         return reverse("imdb:director-detail", kwargs={"pk": self.id})
 
+    class Meta:
+        indexes = [models.Index(fields=['last_name', 'first_name', 'id'], name='director_name_idx')]
+
+
+class SimilarMovie(models.Model):
+    movie = models.ForeignKey(Movie, related_name='similar_movies', on_delete=models.CASCADE)
+    similar = models.ForeignKey(Movie, related_name='similar_to', on_delete=models.CASCADE)
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['-score']
+        indexes = [models.Index(fields=['movie', '-score'])]
+        constraints = [models.UniqueConstraint(fields=['movie', 'similar'], name='unique_similar_movie')]
+
+
+class CatalogCounter(models.Model):
+    name = models.CharField(max_length=30, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
+
+
+class TableVersion(models.Model):
+    name = models.CharField(max_length=63, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    modified = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.name}: {self.version}'
+
+
+class MovieRecommendation(models.Model):
+    user = models.ForeignKey(User, related_name='recommendations', on_delete=models.CASCADE)
+    movie = models.ForeignKey(Movie, related_name='recommendations', on_delete=models.CASCADE)
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['-score']
+        indexes = [models.Index(fields=['user', '-score'])]
+        constraints = [models.UniqueConstraint(fields=['user', 'movie'], name='unique_movie_recommendation')]
+
 
 class MovieComment(models.Model):
     text = models.TextField()
     author = models.ForeignKey(User, related_name='comments', on_delete=models.CASCADE)
-    movie = models.ForeignKey(Movie, related_name='comments', on_delete=models.CASCADE)
+    movie = models.ForeignKey(Movie, related_name='comments', on_delete=models.CASCADE, db_index=False)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created']
+        indexes = [models.Index(fields=['movie', '-created'], name='moviecomment_movie_idx')]
 
 
 class ActorComment(models.Model):
@@ -113,19 +186,23 @@ class PersonalMovieList(models.Model):
 
     class Meta:
         verbose_name_plural = 'Personal lists'
+        indexes = [models.Index(fields=['-created', '-id'], name='personallist_created_idx')]
 
 
 class UserMovieRating(models.Model):
-    user = models.ForeignKey(User, related_name='movie_ratings', on_delete=models.CASCADE)
+    user = models.ForeignKey(User, related_name='movie_ratings', on_delete=models.CASCADE, db_index=False)
     movie = models.ForeignKey(Movie, related_name='user_ratings', on_delete=models.CASCADE)
     value = models.FloatField(default=5.0)
     created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f'{self.value:.1f}'
 
     class Meta:
         ordering = ['-created']
+        indexes = [models.Index(fields=['updated'], name='usermovierating_updated_idx')]
+        constraints = [models.UniqueConstraint(fields=['user', 'movie'], name='unique_user_movie_rating')]
 
 
 class Genre(models.Model):
@@ -138,7 +215,13 @@ class Genre(models.Model):
 
 class Message(models.Model):
     author = models.ForeignKey(User, related_name='send_messages', on_delete=models.CASCADE)
-    addressee = models.ForeignKey(User, related_name='income_messages', on_delete=models.CASCADE)
+    addressee = models.ForeignKey(User, related_name='income_messages', on_delete=models.CASCADE, db_index=False)
     text = models.TextField()
     is_read = models.BooleanField(default=False)
-    created = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['addressee', 'is_read'], name='message_unread_idx'),
+            models.Index(fields=['-created', '-id'], name='message_created_idx'),
+        ]
@@ -0,0 +1,129 @@
+import json
+import time
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.urls import reverse
+
+AVATAR = b'GIF89a\x01\x00\x01\x00\x00\x00\x00;'
+
+# route -> (method, url kwargs, request data, max number of queries)
+ROUTE_BUDGETS = {
+    '': ('get', lambda c: {}, None, 16),
+    'actor/all/': ('get', lambda c: {}, None, 7),
+    'actor/<int:pk>/': ('get', lambda c: {'pk': c.actor.pk}, None, 13),
+    'filter/actor/all/': ('get', lambda c: {}, None, 8),
+    'movie/all/': ('get', lambda c: {}, None, 6),
+    'filter/movie/all/': ('get', lambda c: {}, None, 8),
+    'movie/by-year/<int:year>/': ('get', lambda c: {'year': c.movie.date.year}, None, 11),
+    'movie/<slug:slug>/': ('get', lambda c: {'slug': c.movie.slug}, None, 21),
+    'director/list/': ('get', lambda c: {}, None, 7),
+    'director/<int:pk>/': ('get', lambda c: {'pk': c.director.pk}, None, 12),
+    '<int:pk>/add-comment/': ('post', lambda c: {'pk': c.movie.pk}, {'text': 'new comment'}, 5),
+    '<int:pk>/add-comment2/': ('post', lambda c: {'pk': c.movie.pk}, {'text': 'new comment'}, 5),
+    '<int:pk>/add-actor-comment/': ('post', lambda c: {'pk': c.actor.pk}, {'text': 'new comment'}, 5),
+    'add/director/comment/<int:pk>/': ('post', lambda c: {'pk': c.director.pk}, {'text': 'new comment'}, 5),
+    'sign/out/': ('get', lambda c: {}, None, 4),
+    'auth/': ('get', lambda c: {}, None, 4),
+    'sign/in/': ('post', lambda c: {}, lambda c: {'username': c.user.username, 'password': 'password'}, 6),
+    'add/new_actor/': ('post', lambda c: {}, {'first_name': 'New', 'last_name': 'Actor', 'birth_date': '1990-01-01', 'sex': 'M'}, 5),
+    'create/actor/': ('get', lambda c: {}, None, 4),
+    'create/account/page/': ('get', lambda c: {}, None, 4),
+    'create/new/account/': ('post', lambda c: {}, lambda c: {
+        'username': 'new_user', 'password1': 'secret', 'password2': 'secret', 'first_name': 'New', 'last_name': 'User',
+        'img': SimpleUploadedFile('avatar.gif', AVATAR, content_type='image/gif'),
+    }, 11),
+    'update/watchlist/<int:pk>/': ('post', lambda c: {'pk': c.movie.pk}, {}, 7),
+    'user/movie/lists/': ('get', lambda c: {}, None, 7),
+    'add/personal/movie/list/': ('post', lambda c: {}, {'name': 'new list'}, 3),
+    'add/movie/to/personal/movie_list/<int:pk>/': ('post', lambda c: {'pk': c.movie.pk}, lambda c: {'list_id': c.movie_list.pk}, 4),
+    'remove/movie/from/personal/movie_list/<int:pk1>/<int:pk2>/': ('post', lambda c: {'pk1': c.list_movie.pk, 'pk2': c.movie_list.pk}, {}, 4),
+    'search/': ('get', lambda c: {}, {'pattern': 'movie'}, 12),
+    'autocomplete/': ('get', lambda c: {}, {'q': 'mov'}, 4),
+    'set/user/rate/<int:pk>/': ('post', lambda c: {'pk': c.movie.pk}, {'value': 8}, 11),
+    'user/profile/<int:pk>/': ('get', lambda c: {'pk': c.user.pk}, None, 9),
+    'movie/by/genre/view/<int:pk>/': ('get', lambda c: {'pk': c.genre.pk}, None, 7),
+    'movie/comment/update/<int:pk>/': ('get', lambda c: {'pk': c.comment.pk}, None, 6),
+    'movie/comment/delete/<int:pk>/': ('get', lambda c: {'pk': c.comment.pk}, None, 6),
+    'show/message/view/': ('get', lambda c: {}, None, 5),
+    'send/message/': ('post', lambda c: {}, lambda c: {'addressee': c.other_user.pk, 'text': 'hi'}, 5),
+    'message/list/view/': ('get', lambda c: {}, None, 6),
+    'message/detail_view/<int:pk>/': ('get', lambda c: {'pk': c.message.pk}, None, 7),
+    'reply/message/': ('post', lambda c: {}, lambda c: {'text': 'reply', 'author_id': c.user.pk, 'addressee_id': c.other_user.pk}, 3),
+    'get/to/message/list': ('get', lambda c: {}, None, 6),
+    'api/director/list/': ('get', lambda c: {}, None, 3),
+    'api/actor/list/': ('get', lambda c: {}, None, 3),
+    'api/movie/list/': ('get', lambda c: {}, None, 7),
+    'api/actor/<int:pk>/': ('get', lambda c: {'pk': c.actor.pk}, None, 4),
+    'api/director/update/<int:pk>/': ('patch', lambda c: {'pk': c.director.pk}, {'last_name': 'Updated'}, 7),
+    'api/create/movie/comment/': ('post', lambda c: {}, lambda c: {'text': 'api', 'movie': c.movie.pk, 'author': c.user.pk}, 6),
+    'api/create/movie/comment2/': ('post', lambda c: {}, lambda c: {'text': 'api', 'movie': c.movie.pk}, 5),
+    'api/destroy/movie/comment/<int:pk>/': ('delete', lambda c: {'pk': c.comment.pk}, None, 6),
+    'api/message/list/': ('get', lambda c: {}, None, 3),
+    'api/create/message/': ('post', lambda c: {}, lambda c: {'text': 'api', 'addressee': c.other_user.pk}, 4),
+    'api/update/message/<int:pk>/': ('get', lambda c: {'pk': c.message.pk}, None, 3),
+    'api/destroy/message/<int:pk>/': ('delete', lambda c: {'pk': c.message.pk}, None, 5),
+    'api/personal/movie/list/': ('get', lambda c: {}, None, 4),
+    'api/update/personal/movie/list/<int:pk>/': ('get', lambda c: {'pk': c.movie_list.pk}, None, 3),
+    'api/single/page/actor/list/': ('get', lambda c: {}, None, 4),
+    'api/single/page/movie/list/': ('get', lambda c: {}, None, 7),
+    'api/export/movies.<str:export_format>': ('get', lambda c: {'export_format': 'ndjson'}, None, 3),
+}
+
+# redirect-only routes, budgeted together with the page they send the client to
+FOLLOWED_ROUTES = {'get/to/message/list'}
+
+# anonymous GETs of the cached and conditional routes -> (max queries on a cold cache, max queries when repeated).
+# The repeat sends the first response's ETag, so conditional routes answer it with a 304
+ANONYMOUS_BUDGETS = {
+    '': (7, 1),
+    'actor/all/': (4, 1),
+    'actor/<int:pk>/': (10, 1),
+    'movie/all/': (3, 1),
+    'movie/by-year/<int:year>/': (9, 1),
+    'movie/<slug:slug>/': (12, 1),
+    'director/list/': (4, 1),
+    'director/<int:pk>/': (10, 1),
+    'movie/by/genre/view/<int:pk>/': (4, 1),
+    'api/director/list/': (2, 1),
+    'api/actor/list/': (2, 1),
+    'api/movie/list/': (6, 1),
+    'api/actor/<int:pk>/': (3, 1),
+    'api/single/page/actor/list/': (3, 1),
+    'api/single/page/movie/list/': (6, 1),
+}
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.time += time.perf_counter() - started
+
+
+def route_url(pattern, fixtures):
+    route = str(pattern.pattern)
+    url_kwargs = ROUTE_BUDGETS[route][1](fixtures)
+    if pattern.name:
+        return reverse(f'imdb:{pattern.name}', kwargs=url_kwargs)
+    return '/' + route.replace('<int:pk>', str(url_kwargs.get('pk')))
+
+
+def request_route(client, method, url, data=None, follow=False, **headers):
+    started = time.perf_counter()
+    queries = QueryRecorder()
+    with connection.execute_wrapper(queries):
+        if method == 'patch':
+            response = client.patch(url, json.dumps(data), content_type='application/json', headers=headers)
+        else:
+            response = getattr(client, method)(url, data, follow=follow, headers=headers)
+        if response.streaming:
+            b''.join(response.streaming_content)
+    return response, queries, time.perf_counter() - started
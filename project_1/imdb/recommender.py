@@ -0,0 +1,148 @@
+import datetime
+import os
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import MovieRecommendation, UserMovieRating
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = sparse = None
+
+NEIGHBOURS = 50
+RECOMMENDATIONS = 20
+ITEM_BATCH = 2000
+USER_BATCH = 2000
+RATING_DTYPE = [('user_id', 'i8'), ('movie_id', 'i8'), ('value', 'f4')]
+
+
+def recommender_available():
+    return np is not None
+
+
+def load_ratings(queryset=None):
+    if queryset is None:
+        queryset = UserMovieRating.objects.all()
+    rows = queryset.order_by().values_list('user_id', 'movie_id', 'value').iterator(chunk_size=10000)
+    return np.fromiter(rows, dtype=RATING_DTYPE)
+
+
+def rating_matrix(ratings, movie_ids=None):
+    user_ids, user_rows = np.unique(ratings['user_id'], return_inverse=True)
+    if movie_ids is None:
+        movie_ids, movie_cols = np.unique(ratings['movie_id'], return_inverse=True)
+        known = np.ones(len(ratings), dtype=bool)
+    else:
+        movie_cols = np.searchsorted(movie_ids, ratings['movie_id'])
+        known = (movie_cols < len(movie_ids)) & (movie_ids[np.minimum(movie_cols, len(movie_ids) - 1)] == ratings['movie_id'])
+    matrix = sparse.csr_matrix(
+        (ratings['value'][known], (user_rows[known], movie_cols[known])),
+        shape=(len(user_ids), len(movie_ids)), dtype=np.float32,
+    )
+    return matrix, user_ids, movie_ids
+
+
+def _top_k(row_data, row_indices, k):
+    if len(row_data) > k:
+        top = np.argpartition(-row_data, k - 1)[:k]
+        row_data, row_indices = row_data[top], row_indices[top]
+    order = np.argsort(-row_data, kind='stable')
+    return row_data[order], row_indices[order]
+
+
+def item_neighbours(matrix, k=NEIGHBOURS, batch_size=ITEM_BATCH):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    norms[norms == 0] = 1.0
+    normalized = (matrix @ sparse.diags(1.0 / norms)).tocsc()
+    items = normalized.T.tocsr()
+    num_items = matrix.shape[1]
+    rows, cols, values = [], [], []
+    for start in range(0, num_items, batch_size):
+        block = (items[start:start + batch_size] @ normalized).tocsr()
+        for offset in range(block.shape[0]):
+            begin, end = block.indptr[offset], block.indptr[offset + 1]
+            row_data, row_indices = block.data[begin:end], block.indices[begin:end]
+            keep = row_indices != start + offset
+            row_data, row_indices = _top_k(row_data[keep], row_indices[keep], k)
+            rows.append(np.full(len(row_indices), start + offset))
+            cols.append(row_indices)
+            values.append(row_data)
+    return sparse.csr_matrix(
+        (np.concatenate(values or [[]]), (np.concatenate(rows or [[]]), np.concatenate(cols or [[]]))),
+        shape=(num_items, num_items), dtype=np.float32,
+    )
+
+
+def score_users(matrix, neighbours, k=RECOMMENDATIONS):
+    scores = (matrix @ neighbours).tocsr()
+    recommendations = []
+    for row in range(matrix.shape[0]):
+        begin, end = scores.indptr[row], scores.indptr[row + 1]
+        row_data, row_indices = scores.data[begin:end], scores.indices[begin:end]
+        rated = matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]
+        keep = ~np.isin(row_indices, rated) & (row_data > 0)
+        recommendations.append(_top_k(row_data[keep], row_indices[keep], k))
+    return recommendations
+
+
+def save_model(neighbours, movie_ids, trained_at, path=None):
+    path = path or settings.RECOMMENDER_MODEL_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as model_file:
+        np.savez(
+            model_file, data=neighbours.data, indices=neighbours.indices, indptr=neighbours.indptr,
+            shape=neighbours.shape, movie_ids=movie_ids, trained_at=trained_at.timestamp(),
+        )
+
+
+def load_model(path=None):
+    with np.load(path or settings.RECOMMENDER_MODEL_PATH) as model:
+        neighbours = sparse.csr_matrix((model['data'], model['indices'], model['indptr']), shape=tuple(model['shape']))
+        return neighbours, model['movie_ids'], datetime.datetime.fromtimestamp(float(model['trained_at']), tz=datetime.timezone.utc)
+
+
+def store_recommendations(user_ids, movie_ids, recommendations):
+    with transaction.atomic():
+        MovieRecommendation.objects.filter(user_id__in=user_ids.tolist()).delete()
+        MovieRecommendation.objects.bulk_create([
+            MovieRecommendation(user_id=int(user_id), movie_id=int(movie_ids[col]), score=float(score))
+            for user_id, (scores, cols) in zip(user_ids, recommendations)
+            for score, col in zip(scores, cols)
+        ])
+
+
+def recommend(matrix, user_ids, movie_ids, neighbours, k=RECOMMENDATIONS, batch_size=USER_BATCH):
+    for start in range(0, matrix.shape[0], batch_size):
+        stop = start + batch_size
+        store_recommendations(user_ids[start:stop], movie_ids, score_users(matrix[start:stop], neighbours, k))
+    return matrix.shape[0]
+
+
+def train(neighbours_k=NEIGHBOURS, k=RECOMMENDATIONS, path=None):
+    trained_at = timezone.now()
+    timings = {}
+    started = time.perf_counter()
+    ratings = load_ratings()
+    matrix, user_ids, movie_ids = rating_matrix(ratings)
+    timings['load'], started = time.perf_counter() - started, time.perf_counter()
+    neighbours = item_neighbours(matrix, neighbours_k)
+    save_model(neighbours, movie_ids, trained_at, path)
+    timings['neighbours'], started = time.perf_counter() - started, time.perf_counter()
+    recommend(matrix, user_ids, movie_ids, neighbours, k)
+    timings['recommend'] = time.perf_counter() - started
+    return len(ratings), len(user_ids), timings
+
+
+def update_users(user_ids=None, k=RECOMMENDATIONS, path=None):
+    neighbours, movie_ids, trained_at = load_model(path)
+    if user_ids is None:
+        # updated rather than created: a re-rate goes through update_or_create and keeps the row
+        user_ids = UserMovieRating.objects.filter(updated__gt=trained_at).values_list('user_id', flat=True).distinct()
+    ratings = load_ratings(UserMovieRating.objects.filter(user_id__in=list(user_ids)))
+    matrix, user_ids, _ = rating_matrix(ratings, movie_ids)
+    return recommend(matrix, user_ids, movie_ids, neighbours, k)
@@ -0,0 +1,125 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .models import Actor, Director, Movie
+
+SEARCH_TABLE = 'imdb_search_index'
+
+SEARCH_KINDS = {
+    'movie': (1, Movie),
+    'actor': (2, Actor),
+    'director': (3, Director),
+}
+
+INSERT_SQL = f'INSERT INTO {SEARCH_TABLE} (rowid, title, body, kind, object_id) VALUES (%s, %s, %s, %s, %s)'
+
+
+def fts_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def _rowid(kind, pk):
+    return pk * 4 + SEARCH_KINDS[kind][0]
+
+
+def _document(kind, obj):
+    if kind == 'movie':
+        return obj.title, obj.plot
+    return f'{obj.first_name} {obj.last_name}', ''
+
+
+def index_object(kind, obj):
+    if not fts_enabled():
+        return
+    title, body = _document(kind, obj)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [_rowid(kind, obj.pk)])
+        cursor.execute(INSERT_SQL, [_rowid(kind, obj.pk), title, body, kind, obj.pk])
+
+
+def remove_object(kind, pk):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [_rowid(kind, pk)])
+
+
+def rebuild_index(batch_size=2000):
+    if not fts_enabled():
+        return 0
+    num_rows = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        for kind, (_, model) in SEARCH_KINDS.items():
+            fields = ['id', 'title', 'plot'] if kind == 'movie' else ['id', 'first_name', 'last_name']
+            rows = []
+            for obj in model.objects.only(*fields).order_by().iterator(chunk_size=batch_size):
+                rows.append((_rowid(kind, obj.pk), *_document(kind, obj), kind, obj.pk))
+                if len(rows) >= batch_size:
+                    cursor.executemany(INSERT_SQL, rows)
+                    num_rows += len(rows)
+                    rows = []
+            if rows:
+                cursor.executemany(INSERT_SQL, rows)
+                num_rows += len(rows)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    return num_rows
+
+
+def build_match_query(pattern):
+    tokens = re.findall(r'\w+', pattern or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+class SearchResults:
+    def __init__(self, kind, pattern):
+        self.kind = kind
+        self.model = SEARCH_KINDS[kind][1]
+        self.match = build_match_query(pattern)
+        self.pattern = pattern
+        self._count = None
+
+    def _fallback_queryset(self):
+        if self.kind == 'movie':
+            # a range on lower(title) can use movie_title_lower_idx, istartswith cannot
+            prefix = self.pattern.lower()
+            return self.model.objects.alias(title_lower=Lower('title')).filter(title_lower__gte=prefix, title_lower__lt=prefix + '\U0010ffff').order_by('pk')
+        condition = Q(first_name__istartswith=self.pattern) | Q(last_name__istartswith=self.pattern)
+        return self.model.objects.filter(condition).order_by('pk')
+
+    def count(self):
+        if self._count is None:
+            if not self.match:
+                self._count = 0
+            elif not fts_enabled():
+                self._count = self._fallback_queryset().count()
+            else:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'SELECT count(*) FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s AND kind = %s', [self.match, self.kind])
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start = item.start or 0
+        limit = (item.stop - start) if item.stop is not None else -1
+        if not self.match:
+            return []
+        if not fts_enabled():
+            return list(self._fallback_queryset()[item])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT object_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s AND kind = %s '
+                f'ORDER BY bm25({SEARCH_TABLE}, 10.0, 1.0) LIMIT %s OFFSET %s',
+                [self.match, self.kind, limit, start]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        objects = self.model.objects.in_bulk(ids)
+        return [objects[pk] for pk in ids if pk in objects]
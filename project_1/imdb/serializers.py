@@ -19,7 +19,7 @@ class MovieSerializerSmall(serializers.ModelSerializer):
 
     class Meta:
         model = Movie
-        fields = ['title', 'poster', 'rating', 'date', 'director']
+        fields = ['title', 'poster', 'rating', 'community_rating', 'rating_count', 'date', 'director']
 
 
 class ActorSerializerDetail(serializers.ModelSerializer):
@@ -37,7 +37,7 @@ class MovieSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Movie
-        fields = ['title', 'poster', 'rating', 'date', 'trailer', 'plot', 'actors', 'slug', 'director', 'users_to_watch', 'user_rated_this_movie', 'genres']
+        fields = ['title', 'poster', 'rating', 'community_rating', 'rating_count', 'date', 'trailer', 'plot', 'actors', 'slug', 'director', 'users_to_watch', 'user_rated_this_movie', 'genres']
 
 
 class CreateMovieCommentSerializer(serializers.ModelSerializer):
@@ -98,10 +98,8 @@ class MovieCustomSerializer(serializers.ModelSerializer):
 
 
 class SinglePageActorsListSerializer(serializers.ModelSerializer):
-    num_movies = serializers.IntegerField()
     # movies = serializers.StringRelatedField(many=True)
     movies = MovieCustomSerializer(many=True)
-    avg_rating = serializers.FloatField()
     url_detail = serializers.HyperlinkedIdentityField(view_name='imdb:actor-detail', lookup_field='pk')
 
     class Meta:
@@ -124,4 +122,4 @@ class SinglePageMovieListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Movie
-        fields = ['title', 'poster', 'rating', 'date', 'trailer', 'plot', 'actors', 'slug', 'director', 'users_to_watch', 'user_rated_this_movie', 'genres']
+        fields = ['title', 'poster', 'rating', 'community_rating', 'rating_count', 'date', 'trailer', 'plot', 'actors', 'slug', 'director', 'users_to_watch', 'user_rated_this_movie', 'genres']
@@ -0,0 +1,166 @@
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .autocomplete import prefix_index
+from .cache import invalidate_statistics
+from .counters import counter_name, increment_counter
+from .models import Actor, Director, Movie, UserMovieRating
+from .search import index_object, remove_object
+from .sqlite import apply_pragmas
+from .stats import refresh_actor_stats, refresh_director_stats
+from .versions import VERSIONED_MODELS, bump_versions
+
+
+@receiver(pre_save, sender=Movie)
+def remember_movie_state(sender, instance, **kwargs):
+    instance._old_state = Movie.objects.filter(pk=instance.pk).values('rating', 'director_id').first() if instance.pk else None
+    if instance._old_state and instance._old_state['director_id'] != instance.director_id:
+        instance.similar_stale = True
+
+
+@receiver(post_save, sender=Movie)
+def update_person_stats_on_movie_save(sender, instance, created, **kwargs):
+    old_state = getattr(instance, '_old_state', None)
+    old_director_id = old_state['director_id'] if old_state else None
+    rating_changed = old_state is None or old_state['rating'] != instance.rating
+    if rating_changed or old_director_id != instance.director_id:
+        director_ids = {pk for pk in (old_director_id, instance.director_id) if pk is not None}
+        if director_ids:
+            refresh_director_stats(director_ids)
+    if rating_changed and not created:
+        refresh_actor_stats(instance.actors.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Movie)
+def remember_movie_actors(sender, instance, **kwargs):
+    instance._actor_ids = list(instance.actors.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Movie)
+def update_person_stats_on_movie_delete(sender, instance, **kwargs):
+    if instance.director_id is not None:
+        refresh_director_stats([instance.director_id])
+    if getattr(instance, '_actor_ids', None):
+        refresh_actor_stats(instance._actor_ids)
+
+
+@receiver(m2m_changed, sender=Movie.actors.through)
+def update_actor_stats_on_actors_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and not reverse:
+        instance._cleared_actor_ids = list(instance.actors.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        refresh_actor_stats([instance.pk])
+    elif action == 'post_clear':
+        refresh_actor_stats(getattr(instance, '_cleared_actor_ids', []))
+    else:
+        refresh_actor_stats(pk_set)
+
+
+@receiver(m2m_changed, sender=Movie.actors.through)
+@receiver(m2m_changed, sender=Movie.genres.through)
+def mark_similar_movies_stale(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        Movie.objects.filter(pk=instance.pk).update(similar_stale=True)
+    elif action == 'pre_clear':
+        instance.movies.update(similar_stale=True)
+    else:
+        Movie.objects.filter(pk__in=pk_set).update(similar_stale=True)
+
+
+@receiver(pre_save, sender=UserMovieRating)
+def remember_rating_state(sender, instance, **kwargs):
+    instance._old_state = UserMovieRating.objects.filter(pk=instance.pk).values('value', 'movie_id').first() if instance.pk else None
+
+
+@receiver(post_save, sender=UserMovieRating)
+def update_movie_rating_on_save(sender, instance, **kwargs):
+    old_state = getattr(instance, '_old_state', None)
+    if old_state is None:
+        Movie.objects.filter(pk=instance.movie_id).update(rating_sum=F('rating_sum') + instance.value, rating_count=F('rating_count') + 1, similar_stale=True)
+    elif old_state['movie_id'] != instance.movie_id:
+        Movie.objects.filter(pk=old_state['movie_id']).update(rating_sum=F('rating_sum') - old_state['value'], rating_count=F('rating_count') - 1, similar_stale=True)
+        Movie.objects.filter(pk=instance.movie_id).update(rating_sum=F('rating_sum') + instance.value, rating_count=F('rating_count') + 1, similar_stale=True)
+    elif old_state['value'] != instance.value:
+        Movie.objects.filter(pk=instance.movie_id).update(rating_sum=F('rating_sum') + (instance.value - old_state['value']))
+
+
+@receiver(post_delete, sender=UserMovieRating)
+def update_movie_rating_on_delete(sender, instance, **kwargs):
+    Movie.objects.filter(pk=instance.movie_id).update(rating_sum=F('rating_sum') - instance.value, rating_count=F('rating_count') - 1, similar_stale=True)
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+@receiver(post_save, sender=Actor)
+@receiver(post_delete, sender=Actor)
+@receiver(post_save, sender=Director)
+@receiver(post_delete, sender=Director)
+def update_catalog_counters(sender, created=True, **kwargs):
+    if created:
+        increment_counter(counter_name(sender), 1 if kwargs['signal'] is post_save else -1)
+        invalidate_statistics()
+
+
+def bump_table_version(sender, action='post_save', **kwargs):
+    if action.startswith('post_'):
+        bump_versions(sender)
+
+
+# connected per sender: a catch-all m2m_changed or post_delete receiver turns off Django's fast m2m add and
+# fast delete paths for every model
+for versioned_model in VERSIONED_MODELS:
+    if versioned_model._meta.auto_created:
+        m2m_changed.connect(bump_table_version, sender=versioned_model)
+    else:
+        post_save.connect(bump_table_version, sender=versioned_model)
+        post_delete.connect(bump_table_version, sender=versioned_model)
+
+
+@receiver(post_save, sender=Movie)
+def index_movie(sender, instance, **kwargs):
+    index_object('movie', instance)
+    prefix_index.add('movie', instance)
+
+
+@receiver(post_save, sender=Actor)
+def index_actor(sender, instance, **kwargs):
+    index_object('actor', instance)
+    prefix_index.add('actor', instance)
+
+
+@receiver(post_save, sender=Director)
+def index_director(sender, instance, **kwargs):
+    index_object('director', instance)
+    prefix_index.add('director', instance)
+
+
+@receiver(post_delete, sender=Movie)
+def unindex_movie(sender, instance, **kwargs):
+    remove_object('movie', instance.pk)
+    prefix_index.remove('movie', instance.pk)
+
+
+@receiver(post_delete, sender=Actor)
+def unindex_actor(sender, instance, **kwargs):
+    remove_object('actor', instance.pk)
+    prefix_index.remove('actor', instance.pk)
+
+
+@receiver(post_delete, sender=Director)
+def unindex_director(sender, instance, **kwargs):
+    remove_object('director', instance.pk)
+    prefix_index.remove('director', instance.pk)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            apply_pragmas(cursor)
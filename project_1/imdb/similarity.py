@@ -0,0 +1,126 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+from .models import Genre, Movie, SimilarMovie, UserMovieRating
+
+NEIGHBOURS = 10
+GENRE_WEIGHT = 1.0
+ACTOR_WEIGHT = 0.5
+DIRECTOR_WEIGHT = 1.0
+CO_RATING_WEIGHT = 2.0
+MAX_POSTINGS = 100
+PRESELECT = 50
+GENRE_FALLBACK = 50
+CHUNK_SIZE = 5000
+
+
+def _chunks(ids, size=CHUNK_SIZE):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _pairs(queryset, field, ids):
+    pairs = []
+    for chunk in _chunks(ids):
+        pairs.extend(queryset.filter(**{f'{field}__in': chunk}))
+    return pairs
+
+
+def _grouped(pairs, limit=None):
+    groups = defaultdict(list)
+    for key, value in pairs:
+        if limit is None or len(groups[key]) < limit:
+            groups[key].append(value)
+    return groups
+
+
+def genre_fallback():
+    return {
+        genre_id: list(Movie.objects.filter(genres=genre_id).order_by('-rating').values_list('id', flat=True)[:GENRE_FALLBACK])
+        for genre_id in Genre.objects.values_list('id', flat=True)
+    }
+
+
+def compute_similar_movies(movie_ids, fallback=None):
+    genres = Movie.genres.through.objects.order_by().values_list('movie_id', 'genre_id')
+    actors = Movie.actors.through.objects.order_by().values_list('movie_id', 'actor_id')
+    ratings = UserMovieRating.objects.order_by().values_list('movie_id', 'user_id')
+    fallback = genre_fallback() if fallback is None else fallback
+
+    movie_genres = _grouped(_pairs(genres, 'movie_id', movie_ids))
+    movie_actors = _grouped(_pairs(actors, 'movie_id', movie_ids))
+    movie_raters = _grouped(_pairs(ratings.order_by('-created'), 'movie_id', movie_ids), MAX_POSTINGS)
+    movie_director = dict(Movie.objects.filter(id__in=movie_ids).values_list('id', 'director_id'))
+
+    actor_ids = {actor_id for ids in movie_actors.values() for actor_id in ids}
+    director_ids = {director_id for director_id in movie_director.values() if director_id}
+    user_ids = {user_id for ids in movie_raters.values() for user_id in ids}
+    actor_movies = _grouped(_pairs(actors.values_list('actor_id', 'movie_id').order_by('-movie__rating'), 'actor_id', actor_ids), MAX_POSTINGS)
+    director_movies = _grouped(_pairs(Movie.objects.values_list('director_id', 'id').order_by('-rating'), 'director_id', director_ids), MAX_POSTINGS)
+    user_movies = _grouped(_pairs(ratings.values_list('user_id', 'movie_id').order_by('-value'), 'user_id', user_ids), MAX_POSTINGS)
+
+    candidates = {}
+    for movie_id in movie_ids:
+        shared = Counter()
+        for actor_id in movie_actors.get(movie_id, ()):
+            shared.update(actor_movies[actor_id])
+        co_raters = Counter()
+        for user_id in movie_raters.get(movie_id, ()):
+            co_raters.update(user_movies[user_id])
+        same_director = set(director_movies.get(movie_director.get(movie_id), ()))
+        structural = Counter({other: ACTOR_WEIGHT * count for other, count in shared.items()})
+        structural.update(dict.fromkeys(same_director, DIRECTOR_WEIGHT))
+        others = {other for genre_id in movie_genres.get(movie_id, ()) for other in fallback.get(genre_id, ())}
+        others.update(other for other, _ in structural.most_common(PRESELECT))
+        others.update(other for other, _ in co_raters.most_common(PRESELECT))
+        others.discard(movie_id)
+        candidates[movie_id] = (others, structural, co_raters)
+
+    all_candidates = {other for others, *_ in candidates.values() for other in others}
+    candidate_genres = _grouped(_pairs(genres, 'movie_id', all_candidates))
+    num_raters = dict(_pairs(Movie.objects.values_list('id', 'rating_count'), 'id', all_candidates | set(movie_ids)))
+
+    neighbours = {}
+    for movie_id, (others, structural, co_raters) in candidates.items():
+        own_genres = set(movie_genres.get(movie_id, ()))
+        scored = []
+        for other in others:
+            other_genres = set(candidate_genres.get(other, ()))
+            score = structural[other]
+            if own_genres or other_genres:
+                score += GENRE_WEIGHT * len(own_genres & other_genres) / len(own_genres | other_genres)
+            if co_raters[other]:
+                score += CO_RATING_WEIGHT * co_raters[other] / math.sqrt((num_raters.get(movie_id) or 1) * (num_raters.get(other) or 1))
+            if score > 0:
+                scored.append((score, other))
+        neighbours[movie_id] = heapq.nlargest(NEIGHBOURS, scored)
+    return neighbours
+
+
+def refresh_similar_movies(movie_ids, fallback=None):
+    movie_ids = list(movie_ids)
+    neighbours = compute_similar_movies(movie_ids, fallback)
+    with transaction.atomic():
+        SimilarMovie.objects.filter(movie_id__in=movie_ids).delete()
+        SimilarMovie.objects.bulk_create([
+            SimilarMovie(movie_id=movie_id, similar_id=other, score=score)
+            for movie_id, scored in neighbours.items() for score, other in scored
+        ])
+        Movie.objects.filter(id__in=movie_ids).update(similar_stale=False)
+    return len(movie_ids)
+
+
+def rebuild_similar_movies(stale_only=True, batch_size=500):
+    queryset = Movie.objects.order_by('id')
+    if stale_only:
+        queryset = queryset.filter(similar_stale=True)
+    movie_ids = list(queryset.values_list('id', flat=True))
+    fallback = genre_fallback()
+    num_movies = 0
+    for batch in _chunks(movie_ids, batch_size):
+        num_movies += refresh_similar_movies(batch, fallback)
+    return num_movies
@@ -0,0 +1,36 @@
+import os
+
+from django.conf import settings
+
+# IMDB_SQLITE_PROFILE selects the PRAGMAs run on every new SQLite connection, in Django and in FastApi/main.py.
+# 'default' keeps SQLite's own settings (rollback journal, synchronous=full) and leaves the database file alone;
+# 'tuned' switches it to WAL, which lets readers proceed while a comment or rating is written
+SQLITE_PROFILES = {
+    'tuned': {
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,
+        'temp_store': 'memory',
+        'busy_timeout': 5000,
+    },
+    'default': {},
+}
+
+
+def profile_pragmas():
+    return SQLITE_PROFILES[os.environ.get('IMDB_SQLITE_PROFILE', 'default')]
+
+
+def apply_pragmas(cursor, pragmas=None):
+    pragmas = settings.SQLITE_PRAGMAS if pragmas is None else pragmas
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def read_pragmas(cursor, names):
+    values = {}
+    for name in names:
+        cursor.execute(f'PRAGMA {name}')
+        values[name] = cursor.fetchone()[0]
+    return values
@@ -0,0 +1,39 @@
+from django.db.models import Avg, Count, FloatField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Actor, Director, Movie, UserMovieRating
+
+
+def _person_stats_update(related_field):
+    movies = Movie.objects.filter(**{related_field: OuterRef('pk')}).order_by().values(related_field)
+    avg_rating = movies.annotate(value=Avg('rating')).values('value')
+    num_movies = movies.annotate(value=Count('id')).values('value')
+    return {
+        'avg_rating': Coalesce(Subquery(avg_rating), Value(0.0)),
+        'num_movies': Coalesce(Subquery(num_movies, output_field=IntegerField()), Value(0)),
+    }
+
+
+def refresh_actor_stats(ids=None):
+    queryset = Actor.objects.all()
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    return queryset.update(**_person_stats_update('actors'))
+
+
+def refresh_director_stats(ids=None):
+    queryset = Director.objects.all()
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    return queryset.update(**_person_stats_update('director'))
+
+
+def refresh_movie_rating_stats(ids=None):
+    queryset = Movie.objects.all()
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    ratings = UserMovieRating.objects.filter(movie=OuterRef('pk')).order_by().values('movie')
+    return queryset.update(
+        rating_sum=Coalesce(Subquery(ratings.annotate(value=Sum('value')).values('value'), output_field=FloatField()), Value(0.0)),
+        rating_count=Coalesce(Subquery(ratings.annotate(value=Count('id')).values('value'), output_field=IntegerField()), Value(0)),
+    )
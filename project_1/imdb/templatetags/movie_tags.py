@@ -1,20 +1,34 @@
 from django import template
 from ..models import *
 from ..forms import *
+from ..cache import get_statistics as cached_statistics
 
 register = template.Library()
 
 
 @register.simple_tag(name='statistics')
 def get_statistics():
-    n1 = Movie.objects.count()
-    n2 = Actor.objects.count()
-    n3 = Director.objects.count()
-    return {
-        'num_movies': n1,
-        'num_actors': n2,
-        'num_directors': n3,
-    }
+    return cached_statistics()
+
+
+@register.filter
+def in_watchlist(movie, user_relations):
+    return movie.id in user_relations.watchlist_ids
+
+
+@register.filter
+def is_favourite_actor(actor, user_relations):
+    return actor.id in user_relations.favourite_actor_ids
+
+
+@register.filter
+def is_favourite_director(director, user_relations):
+    return director.id in user_relations.favourite_director_ids
+
+
+@register.filter
+def is_rated(movie, user_relations):
+    return movie.id in user_relations.rated_movie_ids
 
 
 @register.inclusion_tag(filename='imdb/search_form.html', name='search_form_tag')
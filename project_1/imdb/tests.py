@@ -1,3 +1,813 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+import tempfile
+import unittest
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count
+from django.db.models.functions import ExtractYear
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .autocomplete import prefix_index
+from .cache import get_homepage_context, get_statistics
+from .counters import read_counters, reconcile_counters
+from .export import export_rows
+from .middleware import PRIMARY_COOKIE, ReplicaRoutingMiddleware
+from .models import *
+from .querybudget import ANONYMOUS_BUDGETS, FOLLOWED_ROUTES, ROUTE_BUDGETS, request_route, route_url
+from .recommender import recommender_available, train, update_users
+from .routers import ReplicaRouter, read_from_primary
+from .search import SearchResults, build_match_query
+from .signals import configure_sqlite
+from .similarity import rebuild_similar_movies
+from .sqlite import read_pragmas
+from .versions import bump_versions
+
+
+class SinglePageMovieListAPITest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        director = Director.objects.create(first_name='Ridley', last_name='Scott', birth_date='1937-11-30')
+        genres = [Genre.objects.create(name=f'genre {i}') for i in range(3)]
+        actors = [Actor.objects.create(first_name='Actor', last_name=str(i), birth_date='1970-01-01') for i in range(5)]
+        users = [User.objects.create_user(username=f'user{i}', password='password') for i in range(3)]
+        for i in range(12):
+            movie = Movie.objects.create(title=f'Movie {i}', slug=f'movie-{i}', director=director)
+            movie.actors.set(actors)
+            movie.genres.set(genres)
+            movie.users_to_watch.set(users)
+            for user in users:
+                UserMovieRating.objects.create(user=user, movie=movie, value=7.0)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        for page_size in (1, 5, 12):
+            with self.assertNumQueries(6):
+                response = self.client.get('/api/single/page/movie/list/', {'page_size': page_size})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['results']), page_size)
+
+    def test_cursor_pagination(self):
+        response = self.client.get('/api/single/page/movie/list/', {'page_size': 5})
+        first_page = response.json()
+        self.assertEqual(first_page['results'][0]['title'], 'Movie 0')
+        self.assertEqual(len(first_page['results'][0]['actors']), 5)
+        self.assertEqual(first_page['results'][0]['director'], 'Ridley Scott')
+        self.assertEqual(sorted(first_page['results'][0]['user_rated_this_movie']), ['user0', 'user1', 'user2'])
+        second_page = self.client.get(first_page['next']).json()
+        self.assertEqual(second_page['results'][0]['title'], 'Movie 5')
+
+    def test_community_rating(self):
+        movie = self.client.get('/api/single/page/movie/list/', {'page_size': 1}).json()['results'][0]
+        self.assertEqual((movie['community_rating'], movie['rating_count']), (7.0, 3))
+
+
+class CommunityRatingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.movies = [Movie.objects.create(title=f'Movie {i}', slug=f'movie-{i}', date=datetime.date(2000, 1, 1), poster='movie_posters/poster.jpg') for i in range(2)]
+        cls.users = [User.objects.create_user(username=f'user{i}', password='password') for i in range(3)]
+
+    def assertAggregates(self, *expected):
+        for movie, (rating_sum, rating_count) in zip(self.movies, expected):
+            movie.refresh_from_db()
+            self.assertEqual((movie.rating_sum, movie.rating_count), (rating_sum, rating_count))
+            ratings = UserMovieRating.objects.filter(movie=movie).values_list('value', flat=True)
+            self.assertEqual((sum(ratings), len(ratings)), (rating_sum, rating_count))
+
+    def test_aggregates_follow_every_write(self):
+        rating = UserMovieRating.objects.create(user=self.users[0], movie=self.movies[0], value=8)
+        UserMovieRating.objects.create(user=self.users[1], movie=self.movies[0], value=6)
+        self.assertAggregates((14, 2), (0, 0))
+        UserMovieRating.objects.update_or_create(user=self.users[1], movie=self.movies[0], defaults={'value': 9})
+        self.assertAggregates((17, 2), (0, 0))
+        rating.value = 8
+        rating.save()
+        self.assertAggregates((17, 2), (0, 0))
+        rating.movie = self.movies[1]
+        rating.save()
+        self.assertAggregates((9, 1), (8, 1))
+        UserMovieRating.objects.create(user=self.users[2], movie=self.movies[1], value=3)
+        rating.delete()
+        self.assertAggregates((9, 1), (3, 1))
+        UserMovieRating.objects.filter(movie=self.movies[0]).delete()
+        self.users[2].delete()
+        self.assertAggregates((0, 0), (0, 0))
+        self.assertIsNone(self.movies[0].community_rating)
+
+    def test_community_rating_in_lists(self):
+        UserMovieRating.objects.create(user=self.users[0], movie=self.movies[0], value=8)
+        UserMovieRating.objects.create(user=self.users[1], movie=self.movies[0], value=7)
+        movies = {movie['title']: movie for movie in self.client.get('/api/movie/list/').json()['results']}
+        self.assertEqual((movies['Movie 0']['community_rating'], movies['Movie 0']['rating_count']), (7.5, 2))
+        self.assertIsNone(movies['Movie 1']['community_rating'])
+        self.assertContains(self.client.get(reverse('imdb:movie-year-archive', kwargs={'year': 2000})), '7.5 (2)')
+
+
+class KeysetPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        director = Director.objects.create(first_name='Ridley', last_name='Scott', birth_date='1937-11-30')
+        for i in range(7):
+            Movie.objects.create(title=f'Movie {i}', slug=f'movie-{i}', director=director, date=datetime.date(2000 + i // 2, 1, 1))
+
+    def walk(self, url, link):
+        titles = []
+        while url:
+            page = self.client.get(url).json()
+            titles.extend(movie['title'] for movie in page['results'])
+            url = page[link]
+        return titles, page
+
+    def test_pages_follow_ordering_without_gaps(self):
+        titles, last_page = self.walk('/api/movie/list/?page_size=2', 'next')
+        expected = list(Movie.objects.order_by('-date', '-id').values_list('title', flat=True))
+        self.assertEqual(titles, expected)
+        self.assertEqual(len(last_page['results']), 1)
+        self.assertIsNotNone(last_page['previous'])
+
+    def test_previous_link_returns_preceding_page(self):
+        first_page = self.client.get('/api/movie/list/', {'page_size': 3}).json()
+        self.assertIsNone(first_page['previous'])
+        second_page = self.client.get(first_page['next']).json()
+        back = self.client.get(second_page['previous']).json()
+        self.assertEqual(back['results'], first_page['results'])
+        self.assertIsNone(back['previous'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/movie/list/', {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_malformed_cursor_values(self):
+        for values in (['x', 1], [{'a': 1}, 1], ['2000-01-01', 'abc'], [None, 1], ['2000-01-01'], '2000-01-01'):
+            with self.subTest(values=values):
+                cursor = base64.urlsafe_b64encode(json.dumps({'v': values, 'r': False}).encode()).decode()
+                self.assertEqual(self.client.get('/api/movie/list/', {'cursor': cursor}).status_code, 404)
+
+
+class CatalogExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        director = Director.objects.create(first_name='Ridley', last_name='Scott', birth_date='1937-11-30')
+        genre = Genre.objects.create(name='Sci-Fi')
+        actor = Actor.objects.create(first_name='Sigourney', last_name='Weaver', birth_date='1949-10-08')
+        for i in range(5):
+            movie = Movie.objects.create(title=f'Alien {i}', slug=f'alien-{i}', director=director, date=datetime.date(1979 + i, 5, 25))
+            movie.actors.add(actor)
+            movie.genres.add(genre)
+
+    def test_ndjson_endpoint_streams_every_movie(self):
+        response = self.client.get(reverse('imdb:export-movies', kwargs={'export_format': 'ndjson'}))
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['title'] for row in rows], [f'Alien {i}' for i in range(5)])
+        self.assertEqual(rows[0]['director'], 'Ridley Scott')
+        self.assertEqual(rows[0]['actors'], ['Sigourney Weaver'])
+        self.assertEqual(rows[0]['genres'], ['Sci-Fi'])
+
+    def test_unknown_format(self):
+        response = self.client.get(reverse('imdb:export-movies', kwargs={'export_format': 'xml'}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_queries_per_chunk(self):
+        with self.assertNumQueries(7):
+            rows = list(export_rows(chunk_size=2))
+        self.assertEqual(len(rows), 5)
+
+    def test_export_catalog_command_writes_csv(self):
+        out = io.StringIO()
+        call_command('export_catalog', format='csv', stdout=out)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[4]['date'], '1983-05-25')
+        self.assertEqual(rows[4]['actors'], 'Sigourney Weaver')
+
+
+class SimilarMoviesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.scott = Director.objects.create(first_name='Ridley', last_name='Scott', birth_date='1937-11-30', photo='director_imgs/placeholder.jpg')
+        cls.other = Director.objects.create(first_name='Other', last_name='Director', birth_date='1950-01-01')
+        scifi, drama = Genre.objects.create(name='Sci-Fi'), Genre.objects.create(name='Drama')
+        weaver = Actor.objects.create(first_name='Sigourney', last_name='Weaver', birth_date='1949-10-08', photo='actor_imgs/placeholder.jpg')
+        cls.alien = Movie.objects.create(title='Alien', slug='alien', poster='movie_posters/placeholder.jpg', director=cls.scott, trailer='https://www.youtube.com/watch?v=D7VcGasH8pw')
+        cls.aliens = Movie.objects.create(title='Aliens', slug='aliens', poster='movie_posters/placeholder.jpg', director=cls.other)
+        cls.blade_runner = Movie.objects.create(title='Blade Runner', slug='blade-runner', poster='movie_posters/placeholder.jpg', director=cls.scott)
+        cls.unrelated = Movie.objects.create(title='Unrelated', slug='unrelated', poster='movie_posters/placeholder.jpg', director=cls.other)
+        for movie in (cls.alien, cls.aliens, cls.blade_runner):
+            movie.genres.add(scifi)
+        cls.unrelated.genres.add(drama)
+        cls.alien.actors.add(weaver)
+        cls.aliens.actors.add(weaver)
+        cls.user = User.objects.create_user(username='fan', password='password')
+        rebuild_similar_movies()
+
+    def test_neighbours_are_ranked_by_shared_features(self):
+        neighbours = list(self.alien.similar_movies.values_list('similar__title', flat=True))
+        self.assertEqual(neighbours, ['Blade Runner', 'Aliens'])
+        self.assertFalse(Movie.objects.filter(similar_stale=True).exists())
+
+    def test_detail_view_reads_the_neighbour_table(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.alien.get_absolute_url())
+        self.assertEqual([movie.title for movie in response.context['similar_movies']], ['Blade Runner', 'Aliens'])
+
+    def test_changes_mark_movies_stale(self):
+        UserMovieRating.objects.create(user=self.user, movie=self.unrelated, value=8)
+        self.blade_runner.actors.add(Actor.objects.get())
+        self.aliens.director = self.scott
+        self.aliens.save()
+        stale = set(Movie.objects.filter(similar_stale=True).values_list('title', flat=True))
+        self.assertEqual(stale, {'Unrelated', 'Blade Runner', 'Aliens'})
+        rebuild_similar_movies()
+        self.assertEqual(dict(self.blade_runner.similar_movies.values_list('similar__title', 'score')), {'Alien': 2.5, 'Aliens': 2.5})
+
+
+@unittest.skipUnless(recommender_available(), 'numpy and scipy are not installed')
+class RecommenderTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.movies = [Movie.objects.create(title=f'Movie {i}', slug=f'movie-{i}', poster='movie_posters/placeholder.jpg') for i in range(4)]
+        cls.users = [User.objects.create_user(username=f'user{i}', password='password') for i in range(3)]
+        # users 0 and 1 rate movies 0 and 1 alike, user 1 also liked movie 2
+        for user, movie, value in [(0, 0, 9), (0, 1, 8), (1, 0, 9), (1, 1, 8), (1, 2, 9), (2, 3, 7)]:
+            UserMovieRating.objects.create(user=cls.users[user], movie=cls.movies[movie], value=value)
+
+    def setUp(self):
+        model_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(model_dir.cleanup)
+        settings_override = override_settings(RECOMMENDER_MODEL_PATH=os.path.join(model_dir.name, 'recommender.npz'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def recommended(self, user):
+        return list(user.recommendations.values_list('movie__title', flat=True))
+
+    def test_train_recommends_unrated_co_rated_movies(self):
+        num_ratings, num_users, _ = train()
+        self.assertEqual((num_ratings, num_users), (6, 3))
+        self.assertEqual(self.recommended(self.users[0]), ['Movie 2'])
+        self.assertEqual(self.recommended(self.users[2]), [])
+
+    def test_incremental_update_uses_stored_model(self):
+        train()
+        UserMovieRating.objects.create(user=self.users[2], movie=self.movies[0], value=9)
+        self.assertEqual(update_users(), 1)
+        self.assertEqual(self.recommended(self.users[2]), ['Movie 1', 'Movie 2'])
+
+    def test_incremental_update_picks_up_re_rates(self):
+        train()
+        self.assertEqual(update_users(), 0)
+        UserMovieRating.objects.update_or_create(user=self.users[1], movie=self.movies[2], defaults={'value': 1})
+        self.assertEqual(update_users(), 1)
+
+    def test_model_directory_is_created(self):
+        with tempfile.TemporaryDirectory() as data_dir, override_settings(RECOMMENDER_MODEL_PATH=os.path.join(data_dir, 'models', 'recommender.npz')):
+            train()
+            self.assertTrue(os.path.exists(os.path.join(data_dir, 'models', 'recommender.npz')))
+
+    def test_index_shows_recommendations(self):
+        train()
+        self.client.force_login(self.users[0])
+        response = self.client.get(reverse('imdb:index'))
+        self.assertEqual([movie.title for movie in response.context['recommended_movies']], ['Movie 2'])
+
+
+class ViewCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.director = Director.objects.create(first_name='Ridley', last_name='Scott', birth_date='1937-11-30', photo='director_imgs/placeholder.jpg')
+        cls.user = User.objects.create_user(username='fan', password='password', first_name='Film', last_name='Fan')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_list_is_served_from_cache(self):
+        self.client.get(reverse('imdb:director-list'))
+        # the table versions only
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('imdb:director-list'))
+        self.assertContains(response, 'Ridley Scott')
+
+    def test_model_changes_invalidate_cached_pages(self):
+        self.client.get(reverse('imdb:director-list'))
+        Director.objects.create(first_name='James', last_name='Cameron', birth_date='1954-08-16', photo='director_imgs/placeholder.jpg')
+        self.assertContains(self.client.get(reverse('imdb:director-list')), 'James Cameron')
+
+    def test_ratings_and_other_processes_invalidate_cached_pages(self):
+        movie = Movie.objects.create(title='Alien', date=datetime.date(2000, 5, 25), slug='alien', poster='movie_posters/poster.jpg')
+        url = reverse('imdb:movie-year-archive', kwargs={'year': 2000})
+        self.assertNotContains(self.client.get(url), '(1)')
+        UserMovieRating.objects.create(user=self.user, movie=movie, value=8)
+        self.assertContains(self.client.get(url), '8.0 (1)')
+        Movie.objects.filter(pk=movie.pk).update(title='Aliens')
+        bump_versions(Movie)
+        self.assertContains(self.client.get(url), 'Aliens')
+
+    def test_authenticated_requests_bypass_cache(self):
+        self.client.get(reverse('imdb:director-list'))
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('imdb:director-list'))
+        self.assertContains(response, 'Film Fan')
+
+    def test_statistics_are_cached_until_a_row_is_created(self):
+        self.client.get(reverse('imdb:director-list'))
+        self.director.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(cache.get('imdb:statistics')['num_directors'], 1)
+        Director.objects.create(first_name='James', last_name='Cameron', birth_date='1954-08-16')
+        self.assertIsNone(cache.get('imdb:statistics'))
+
+    def test_homepage_context_is_cached_per_catalog_version(self):
+        get_homepage_context()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_homepage_context()['top_directors'], [self.director])
+        movie = Movie.objects.create(title='Alien', rating=8.5, date=datetime.date(1979, 5, 25), slug='alien')
+        self.assertEqual(get_homepage_context()['top_movies'], [movie])
+        actor = Actor.objects.create(first_name='Sigourney', last_name='Weaver', sex='F')
+        self.assertEqual(get_homepage_context()['top_actors_female'], [actor])
+        movie.actors.add(actor)
+        self.assertEqual(get_homepage_context()['top_actors_female'][0].avg_rating, 8.5)
+        self.director.last_name = 'Scott Jr'
+        self.director.save()
+        self.assertEqual(str(get_homepage_context()['top_directors'][0]), 'Ridley Scott Jr')
+        movie.delete()
+        self.assertEqual(get_homepage_context()['top_movies'], [])
+
+    def test_homepage_follows_writes_from_other_processes(self):
+        movie = Movie.objects.create(title='Alien', rating=8.5, date=datetime.date(1979, 5, 25), slug='alien')
+        get_homepage_context()
+        Movie.objects.filter(pk=movie.pk).update(title='Aliens')
+        bump_versions(Movie)
+        self.assertEqual(get_homepage_context()['top_movies'][0].title, 'Aliens')
+
+
+class ConditionalRequestTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.director = Director.objects.create(first_name='Ridley', last_name='Scott', birth_date='1937-11-30', photo='director_imgs/placeholder.jpg')
+        cls.actor = Actor.objects.create(first_name='Sigourney', last_name='Weaver', birth_date='1949-10-08', photo='actor_imgs/placeholder.jpg')
+        cls.movie = Movie.objects.create(title='Alien', slug='alien', director=cls.director, poster='movie_posters/placeholder.jpg', trailer='https://www.youtube.com/watch?v=D7VcGasH8pw')
+        cls.movie.actors.add(cls.actor)
+        cls.user = User.objects.create_user(username='fan', password='password')
+
+    def test_unchanged_pages_are_not_rendered_again(self):
+        for url in (reverse('imdb:movie-detail', kwargs={'slug': 'alien'}), reverse('imdb:actor-detail', kwargs={'pk': self.actor.pk}), '/api/movie/list/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                with self.assertNumQueries(1):
+                    self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+                self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+    def test_changes_to_rendered_tables_change_the_etag(self):
+        url = reverse('imdb:director-detail', kwargs={'pk': self.director.pk})
+        etag = self.client.get(url)['ETag']
+        Genre.objects.create(name='Horror')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        DirectorComment.objects.create(director=self.director, author=self.user, text='great')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'great')
+        self.assertNotEqual(response['ETag'], etag)
+        url = reverse('imdb:actor-detail', kwargs={'pk': self.actor.pk})
+        etag = self.client.get(url)['ETag']
+        self.movie.actors.remove(self.actor)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_person_counts_in_the_header_change_the_etag(self):
+        url = reverse('imdb:actor-detail', kwargs={'pk': self.actor.pk})
+        etag = self.client.get(url)['ETag']
+        Director.objects.create(first_name='James', last_name='Cameron', birth_date='1954-08-16')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_api_etag_depends_on_the_renderer(self):
+        json_etag = self.client.get('/api/actor/list/', HTTP_ACCEPT='application/json')['ETag']
+        self.assertNotEqual(self.client.get('/api/actor/list/', HTTP_ACCEPT='text/html')['ETag'], json_etag)
+
+    def test_authenticated_pages_are_always_rendered(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('imdb:movie-detail', kwargs={'slug': 'alien'}))
+        self.assertFalse(response.has_header('ETag'))
+
+
+class CatalogCounterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_signals_keep_counters_in_step(self):
+        director = Director.objects.create(first_name='Ridley', last_name='Scott', birth_date='1937-11-30')
+        Movie.objects.create(title='Alien', slug='alien', director=director)
+        Movie.objects.create(title='Aliens', slug='aliens', director=director).delete()
+        director.save()
+        self.assertEqual(read_counters(), {'num_movies': 1, 'num_actors': 0, 'num_directors': 1})
+
+    def test_statistics_tag_is_a_single_read(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(get_statistics(), {'num_movies': 0, 'num_actors': 0, 'num_directors': 0})
+
+    def test_reconcile_fixes_drift(self):
+        Actor.objects.bulk_create([Actor(first_name='Actor', last_name=str(i), birth_date='1970-01-01') for i in range(3)])
+        out = io.StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('num_actors: 3 (drift +3)', out.getvalue())
+        self.assertEqual(get_statistics()['num_actors'], 3)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'plans are asserted against EXPLAIN QUERY PLAN output')
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='fan', password='password')
+        cls.movie = Movie.objects.create(title='Alien', slug='alien')
+
+    def assertUsesIndex(self, queryset, index, ordered=True):
+        plan = queryset.explain()
+        for line in plan.splitlines():
+            if ' SCAN ' in line or ' SEARCH ' in line:
+                self.assertIn(' USING ', line, plan)
+        self.assertIn(index, plan)
+        if ordered:
+            self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan)
+
+    def test_catalog_queries(self):
+        self.assertUsesIndex(Movie.objects.filter(slug='alien'), 'imdb_movie_slug')
+        self.assertUsesIndex(Movie.objects.order_by('-rating')[:6], 'movie_rating_idx')
+        self.assertUsesIndex(Movie.objects.order_by('-date', '-id')[:21], 'movie_date_idx')
+        self.assertUsesIndex(Movie.objects.filter(date__year=1979).order_by('-date'), 'movie_date_idx')
+        self.assertUsesIndex(Movie.objects.values(year=ExtractYear('date')).annotate(num=Count('id')).order_by('year'), 'COVERING INDEX movie_date_idx')
+        self.assertUsesIndex(SearchResults('movie', 'ali')._fallback_queryset(), 'movie_title_lower_idx', ordered=False)
+        self.assertUsesIndex(Actor.objects.filter(sex='F').order_by('-avg_rating')[:6], 'actor_sex_rating_idx')
+        self.assertUsesIndex(Actor.objects.order_by('last_name', 'first_name', 'id')[:21], 'actor_name_idx')
+        self.assertUsesIndex(Director.objects.order_by('last_name', 'first_name')[:21], 'director_name_idx')
+
+    def test_user_queries(self):
+        self.assertUsesIndex(Message.objects.filter(is_read=False, addressee=self.user), 'message_unread_idx')
+        self.assertUsesIndex(Message.objects.order_by('-created', '-id')[:21], 'message_created_idx')
+        self.assertUsesIndex(MovieComment.objects.filter(movie=self.movie), 'moviecomment_movie_idx')
+        self.assertUsesIndex(PersonalMovieList.objects.order_by('-created', '-id')[:21], 'personallist_created_idx')
+        self.assertUsesIndex(UserMovieRating.objects.filter(user=self.user, movie=self.movie), '(user_id=? AND movie_id=?)')
+
+    def test_one_rating_per_user_and_movie(self):
+        UserMovieRating.objects.create(user=self.user, movie=self.movie, value=8)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            UserMovieRating.objects.create(user=self.user, movie=self.movie, value=9)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'the search index is an FTS5 table')
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for title, plot in [('Alien', 'A crew meets a creature.'), ('Aliens', 'The creature returns.'), ('Space Horror', 'An alien hunts the crew.'), ('Planet of the Alien', '')]:
+            Movie.objects.create(title=title, plot=plot, slug=title.lower().replace(' ', '-'))
+        Actor.objects.create(first_name='Sigourney', last_name='Weaver')
+        Actor.objects.create(first_name='Alison', last_name='Lohman')
+
+    def titles(self, pattern, kind='movie'):
+        return [str(obj) if kind != 'movie' else obj.title for obj in SearchResults(kind, pattern)[:10]]
+
+    def test_title_matches_rank_above_plot_matches(self):
+        titles = self.titles('alien')
+        self.assertEqual(set(titles[:3]), {'Alien', 'Aliens', 'Planet of the Alien'})
+        self.assertEqual(titles[3:], ['Space Horror'])
+        self.assertEqual(SearchResults('movie', 'alien').count(), 4)
+
+    def test_every_token_is_a_prefix(self):
+        self.assertEqual(build_match_query('ali  pla-'), '"ali"* "pla"*')
+        self.assertEqual(set(self.titles('ali')), {'Alien', 'Aliens', 'Planet of the Alien', 'Space Horror'})
+        self.assertEqual(self.titles('pla ali'), ['Planet of the Alien'])
+        self.assertEqual(self.titles('wea sig', kind='actor'), ['Sigourney Weaver'])
+
+    def test_query_syntax_is_searched_as_text(self):
+        for pattern in ['"alien', 'alien"', 'alien*', '*', 'alien NEAR crew', 'NEAR(alien crew)', '-alien', 'alien -crew', 'alien OR aliens', 'AND', '(alien', 'title:alien', '^alien', "alien's", '"']:
+            with self.subTest(pattern=pattern):
+                results = SearchResults('movie', pattern)
+                results.count()
+                results[:10]
+        self.assertEqual(build_match_query('alien" OR "crew'), '"alien"* "OR"* "crew"*')
+        self.assertEqual(self.titles('-alien'), self.titles('alien'))
+        self.assertEqual(self.titles('"'), [])
+        self.assertEqual(SearchResults('movie', '*').count(), 0)
+
+    def test_fallback_matches_name_prefixes(self):
+        self.assertEqual(list(SearchResults('movie', 'ALI')._fallback_queryset().values_list('title', flat=True)), ['Alien', 'Aliens'])
+        self.assertEqual([str(actor) for actor in SearchResults('actor', 'wea')._fallback_queryset()], ['Sigourney Weaver'])
+        self.assertEqual([str(actor) for actor in SearchResults('actor', 'ali')._fallback_queryset()], ['Alison Lohman'])
+
+    def test_results_mark_movies_the_user_rated(self):
+        Movie.objects.update(poster='movie_posters/poster.jpg')
+        user = User.objects.create_user(username='fan', password='password')
+        UserMovieRating.objects.create(user=user, movie=Movie.objects.get(title='Aliens'), value=8)
+        self.client.force_login(user)
+        response = self.client.get(reverse('imdb:search'), {'pattern': 'alien'})
+        self.assertContains(response, 'fa-user-check', count=1)
+
+    def test_signals_keep_the_index_in_sync(self):
+        movie = Movie.objects.get(title='Aliens')
+        movie.title = 'Predator'
+        movie.save()
+        self.assertEqual(self.titles('predator'), ['Predator'])
+        self.assertNotIn('Predator', self.titles('aliens'))
+        movie.delete()
+        self.assertEqual(self.titles('predator'), [])
+        Actor.objects.get(last_name='Weaver').delete()
+        self.assertEqual(self.titles('weaver', kind='actor'), [])
+        Director.objects.create(first_name='Ridley', last_name='Scott')
+        self.assertEqual(self.titles('scott', kind='director'), ['Ridley Scott'])
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'SQLite connection tuning')
+class SqliteTuningTest(TransactionTestCase):
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234, 'temp_store': 'memory', 'cache_size': -4096})
+    def test_new_connections_get_pragmas(self):
+        configure_sqlite(sender=type(connection), connection=connection)
+        with connection.cursor() as cursor:
+            self.assertEqual(read_pragmas(cursor, ['busy_timeout', 'temp_store', 'cache_size']), {'busy_timeout': 1234, 'temp_store': 2, 'cache_size': -4096})
+
+    def test_benchmark_compares_profiles(self):
+        User.objects.create_user(username='fan', password='password')
+        Movie.objects.create(title='Alien', slug='alien')
+        out = io.StringIO()
+        call_command('benchmark_sqlite', seconds=0.2, readers=1, writers=1, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split()[0] for line in lines], ['profile', 'default', 'tuned'])
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRoutingTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def respond(self, request, write=False):
+        routed = []
+
+        def view(request):
+            routed.append(self.router.db_for_read(Movie))
+            if write:
+                self.router.db_for_write(Movie)
+                routed.append(self.router.db_for_read(Movie))
+            return HttpResponse()
+
+        return routed, ReplicaRoutingMiddleware(view)(request)
+
+    def test_reads_go_to_replica(self):
+        routed, response = self.respond(self.factory.get('/'))
+        self.assertEqual(routed, ['replica_1'])
+        self.assertNotIn(PRIMARY_COOKIE, response.cookies)
+
+    def test_write_pins_reads_to_primary(self):
+        outside = read_from_primary.get()
+        routed, response = self.respond(self.factory.get('/'), write=True)
+        self.assertEqual(routed, ['replica_1', 'default'])
+        self.assertEqual(response.cookies[PRIMARY_COOKIE]['max-age'], settings.REPLICA_STICKY_SECONDS)
+        self.assertEqual(read_from_primary.get(), outside)
+
+    def test_unsafe_methods_and_recent_writers_read_primary(self):
+        self.assertEqual(self.respond(self.factory.post('/'))[0], ['default'])
+        request = self.factory.get('/')
+        request.COOKIES[PRIMARY_COOKIE] = '1'
+        routed, response = self.respond(request)
+        self.assertEqual(routed, ['default'])
+        self.assertNotIn(PRIMARY_COOKIE, response.cookies)
+
+
+IMDB_DUMPS = {
+    'title.basics.tsv.gz': [
+        'tconst\ttitleType\tprimaryTitle\toriginalTitle\tisAdult\tstartYear\tendYear\truntimeMinutes\tgenres',
+        'tt0078748\tmovie\tAlien\tAlien\t0\t1979\t\\N\t117\tHorror,Sci-Fi',
+        'tt0090605\tmovie\tAliens\tAliens\t0\t1986\t\\N\t137\tAction,Sci-Fi',
+        'tt0108778\ttvSeries\tFriends\tFriends\t0\t1994\t2004\t22\tComedy',
+    ],
+    'title.ratings.tsv': [
+        'tconst\taverageRating\tnumVotes',
+        'tt0078748\t8.5\t900000',
+        'tt0090605\t8.4\t750000',
+    ],
+    'name.basics.tsv': [
+        'nconst\tprimaryName\tbirthYear\tdeathYear\tprimaryProfession\tknownForTitles',
+        'nm0000244\tSigourney Weaver\t1949\t\\N\tactress\ttt0078748',
+        'nm0000631\tRidley Scott\t1937\t\\N\tdirector\ttt0078748',
+        'nm0000116\tJames Cameron\t\\N\t\\N\tdirector\ttt0090605',
+        'nm0001454\tMatthew Perry\t1969\t2023\tactor\ttt0108778',
+    ],
+    'title.principals.tsv': [
+        'tconst\tordering\tnconst\tcategory\tjob\tcharacters',
+        'tt0078748\t1\tnm0000244\tactress\t\\N\t["Ripley"]',
+        'tt0078748\t2\tnm0000631\tdirector\t\\N\t\\N',
+        'tt0090605\t1\tnm0000244\tactress\t\\N\t["Ripley"]',
+        'tt0090605\t2\tnm0000116\tdirector\t\\N\t\\N',
+        'tt0108778\t1\tnm0001454\tactor\t\\N\t["Chandler"]',
+    ],
+}
+
+
+class ImportImdbTest(TestCase):
+    def setUp(self):
+        data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(data_dir.cleanup)
+        self.data_dir = data_dir.name
+        for name, lines in IMDB_DUMPS.items():
+            opener = gzip.open if name.endswith('.gz') else open
+            with opener(os.path.join(self.data_dir, name), 'wt', encoding='utf-8') as dump:
+                dump.write('\n'.join(lines) + '\n')
+
+    def import_imdb(self, **options):
+        call_command('import_imdb', self.data_dir, batch_size=1, skip_index=True, stdout=io.StringIO(), **options)
+
+    def test_import(self):
+        self.import_imdb()
+        alien = Movie.objects.get(imdb_id='tt0078748')
+        self.assertEqual((alien.title, alien.date, alien.rating), ('Alien', datetime.date(1979, 1, 1), 8.5))
+        self.assertEqual(alien.slug, 'alien-tt0078748')
+        self.assertEqual(str(alien.director), 'Ridley Scott')
+        self.assertEqual(sorted(alien.genres.values_list('name', flat=True)), ['Horror', 'Sci-Fi'])
+        weaver = Actor.objects.get(imdb_id='nm0000244')
+        self.assertEqual((weaver.first_name, weaver.last_name, weaver.sex), ('Sigourney', 'Weaver', 'F'))
+        self.assertEqual(weaver.num_movies, 2)
+        self.assertIsNone(Director.objects.get(imdb_id='nm0000116').birth_date)
+        self.assertFalse(Movie.objects.filter(imdb_id='tt0108778').exists())
+        self.assertFalse(Actor.objects.filter(imdb_id='nm0001454').exists())
+        self.assertFalse(os.path.exists(os.path.join(self.data_dir, '.import_imdb.json')))
+
+    def test_reimport_updates_in_place(self):
+        self.import_imdb()
+        self.import_imdb()
+        self.assertEqual(Movie.objects.count(), 2)
+        self.assertEqual(Actor.objects.count(), 1)
+        self.assertEqual(Director.objects.count(), 2)
+        self.assertEqual(Movie.actors.through.objects.count(), 2)
+
+    def test_resume_from_checkpoint(self):
+        with open(os.path.join(self.data_dir, '.import_imdb.json'), 'w') as checkpoint:
+            json.dump({'stage': 'movies', 'line': 1}, checkpoint)
+        self.import_imdb()
+        self.assertEqual(list(Movie.objects.values_list('imdb_id', flat=True)), ['tt0090605'])
+        self.assertEqual(str(Movie.objects.get().director), 'James Cameron')
+
+
+class SeedCatalogTest(TestCase):
+    def seed(self, seed, **options):
+        out = io.StringIO()
+        call_command('seed_catalog', movies=20, seed=seed, stdout=out, **options)
+        return out.getvalue()
+
+    def test_similar_movies_are_optional_and_timed(self):
+        output = self.seed(1, skip_similar=True, skip_index=True)
+        self.assertNotIn('Similar movies', output)
+        self.assertFalse(SimilarMovie.objects.exists())
+        self.assertEqual(Movie.objects.filter(similar_stale=True).count(), 20)
+        self.assertRegex(self.seed(2), r'Similar movies: 40 movies in [\d.]+s')
+
+
+class AutocompleteTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Movie.objects.bulk_create([Movie(title=f'Alpha {i}', rating=1 + i / 100, date=datetime.date(2000, 1, 1), slug=f'alpha-{i}') for i in range(50)])
+        cls.best = Movie.objects.create(title='Azure', rating=9.5, date=datetime.date(2001, 1, 1), slug='azure')
+        Actor.objects.create(first_name='Zed', last_name='Alpine', avg_rating=9.0)
+
+    def setUp(self):
+        prefix_index.load()
+
+    def labels(self, prefix, limit=10):
+        return [entry['label'] for entry in prefix_index.complete(prefix, limit=limit)]
+
+    def test_short_prefixes_rank_the_whole_index(self):
+        self.assertEqual(self.labels('a', limit=3), ['Azure (2001)', 'Zed Alpine', 'Alpha 49 (2000)'])
+        self.assertEqual(self.labels('AL', limit=2), ['Zed Alpine', 'Alpha 49 (2000)'])
+        self.assertEqual(self.labels('zzz'), [])
+
+    def test_long_prefixes_match_any_word(self):
+        self.assertEqual(self.labels('alpine'), ['Zed Alpine'])
+        self.assertEqual(self.labels('alpha 1', limit=3), ['Alpha 19 (2000)', 'Alpha 18 (2000)', 'Alpha 17 (2000)'])
+        self.assertEqual(self.labels('2001'), ['Azure (2001)'])
+
+    def test_signals_keep_the_index_current(self):
+        self.best.rating = 0.5
+        self.best.save()
+        self.assertEqual(self.labels('a', limit=1), ['Zed Alpine'])
+        Movie.objects.create(title='Aardvark', rating=9.9, date=datetime.date(2002, 1, 1), slug='aardvark')
+        self.assertEqual(self.labels('aa'), ['Aardvark (2002)'])
+        Actor.objects.get(last_name='Alpine').delete()
+        self.best.delete()
+        self.assertEqual(self.labels('az'), [])
+        self.assertNotIn('Zed Alpine', self.labels('a', limit=100))
+
+    @override_settings(AUTOCOMPLETE_RECHECK_SECONDS=0)
+    def test_writes_around_the_signals_reload_the_index(self):
+        actor = Actor.objects.create(first_name='Quentin', last_name='Quill')
+        self.assertEqual(self.labels('qu'), ['Quentin Quill'])
+        Movie.objects.filter(title='Alpha 0').update(title='Quasar')
+        self.assertEqual(self.labels('qu'), ['Quentin Quill'])
+        bump_versions(Movie)
+        self.assertEqual(self.labels('qu'), ['Quasar (2000)', 'Quentin Quill'])
+        self.best.actors.add(actor)
+        self.assertEqual(self.labels('qu'), ['Quentin Quill', 'Quasar (2000)'])
+        self.assertEqual(prefix_index.complete('qu')[0]['rating'], 9.5)
+
+    def test_lookups_between_rechecks_skip_the_database(self):
+        self.labels('a')
+        with self.assertNumQueries(0):
+            self.labels('alp')
+
+
+BENCH_SCALE = int(os.environ.get('IMDB_BENCH_SCALE', '1'))
+
+
+class RouteQueryBudgetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_catalog', movies=30 * BENCH_SCALE, actors=20 * BENCH_SCALE, directors=5 * BENCH_SCALE, genres=5 * BENCH_SCALE,
+            users=5 * BENCH_SCALE, actors_per_movie=2, ratings_per_user=10, seed=42, stdout=io.StringIO(),
+        )
+        cls.user, cls.other_user = User.objects.order_by('pk')[:2]
+        cls.user.is_staff = True
+        cls.user.save()
+        cls.movie = Movie.objects.filter(actors__isnull=False).first()
+        cls.actor = cls.movie.actors.first()
+        cls.director = cls.movie.director
+        cls.genre = Genre.objects.filter(movies__isnull=False).first()
+        # the seed command writes no comments or messages
+        cls.comment = MovieComment.objects.create(movie=cls.movie, author=cls.user, text='mine')
+        MovieComment.objects.create(movie=cls.movie, author=cls.other_user, text='theirs')
+        ActorComment.objects.create(actor=cls.actor, author=cls.other_user, text='comment')
+        DirectorComment.objects.create(director=cls.director, author=cls.other_user, text='comment')
+        cls.message = Message.objects.create(author=cls.user, addressee=cls.other_user, text='hello')
+        Message.objects.create(author=cls.other_user, addressee=cls.user, text='hello')
+        cls.movie_list = cls.user.lists.first()
+        cls.list_movie = cls.movie_list.movies.first()
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _route_patterns(self):
+        from .urls import urlpatterns
+        return [str(pattern.pattern) for pattern in urlpatterns]
+
+    def test_every_route_has_a_budget(self):
+        missing = set(self._route_patterns()) - set(ROUTE_BUDGETS)
+        self.assertFalse(missing, f'Routes without a query budget: {sorted(missing)}')
+
+    def test_route_query_budgets(self):
+        from .urls import urlpatterns
+        for pattern in urlpatterns:
+            route = str(pattern.pattern)
+            if route not in ROUTE_BUDGETS:
+                continue
+            method, _, data, budget = ROUTE_BUDGETS[route]
+            data = data(self) if callable(data) else data
+            with self.subTest(route=route), transaction.atomic():
+                cache.clear()
+                self.client.force_login(self.user)
+                response, queries, _ = request_route(self.client, method, route_url(pattern, self), data, follow=route in FOLLOWED_ROUTES)
+                self.assertLess(response.status_code, 400)
+                self.assertLessEqual(queries.count, budget, f'{route} made {queries.count} queries, budget is {budget}')
+                transaction.set_rollback(True)
+
+    def test_create_account_budget_creates_the_account(self):
+        _, _, data, _ = ROUTE_BUDGETS['create/new/account/']
+        self.assertRedirects(self.client.post(reverse('imdb:create-new-account'), data(self)), reverse('imdb:index'), fetch_redirect_response=False)
+        self.assertTrue(Profile.objects.filter(user__username='new_user').exists())
+
+    def test_benchmark_routes_reports_get_routes_and_rolls_back(self):
+        num_comments = MovieComment.objects.count()
+        out = io.StringIO()
+        call_command('benchmark_routes', username=self.user.username, stdout=out)
+        self.assertIn('movie/all/', out.getvalue())
+        self.assertNotIn('add/new_actor/', out.getvalue())
+        self.assertEqual(MovieComment.objects.count(), num_comments)
+
+    def test_anonymous_route_query_budgets(self):
+        from .urls import urlpatterns
+        self.assertEqual(set(ANONYMOUS_BUDGETS) - set(self._route_patterns()), set())
+        for pattern in urlpatterns:
+            route = str(pattern.pattern)
+            if route not in ANONYMOUS_BUDGETS:
+                continue
+            cold_budget, warm_budget = ANONYMOUS_BUDGETS[route]
+            url = route_url(pattern, self)
+            with self.subTest(route=route):
+                cache.clear()
+                response, queries, _ = request_route(self.client, 'get', url)
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(queries.count, cold_budget, f'{route} made {queries.count} queries on a cold cache, budget is {cold_budget}')
+                etag = response.get('ETag')
+                response, queries, _ = request_route(self.client, 'get', url, **({'If-None-Match': etag} if etag else {}))
+                self.assertEqual(response.status_code, 304 if etag else 200)
+                self.assertLessEqual(queries.count, warm_budget, f'{route} made {queries.count} queries when repeated, budget is {warm_budget}')
@@ -34,6 +34,7 @@ urlpatterns = [
     path('add/movie/to/personal/movie_list/<int:pk>/', add_movie_to_personal_movie_list, name='add-movie-to-personal-movie-list'),
     path('remove/movie/from/personal/movie_list/<int:pk1>/<int:pk2>/', remove_movie_from_personal_movie_list, name='remove-movie-from-personal-movie-list'),
     path('search/', search, name='search'),
+    path('autocomplete/', autocomplete, name='autocomplete'),
     path('set/user/rate/<int:pk>/', set_user_rate, name='set-user-rate'),
     path('user/profile/<int:pk>/', UserProfileView.as_view(), name='user-profile'),
     path('movie/by/genre/view/<int:pk>/', MovieByGenreView.as_view(), name='movie-by-genre-view'),
@@ -60,5 +61,6 @@ urlpatterns = [
     path('api/personal/movie/list/', PersonalMovieListAPIView.as_view()),
     path('api/update/personal/movie/list/<int:pk>/', UpdatePersonalMovieListAPIView.as_view()),
     path('api/single/page/actor/list/', SinglePageActorsListAPIView.as_view()),
-    path('api/single/page/movie/list/', SinglePageMovieListAPIView.as_view())
+    path('api/single/page/movie/list/', SinglePageMovieListAPIView.as_view()),
+    path('api/export/movies.<str:export_format>', export_movies, name='export-movies')
 ]
\ No newline at end of file
@@ -0,0 +1,39 @@
+import hashlib
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Actor, ActorComment, Director, DirectorComment, Genre, Movie, MovieComment, Profile, TableVersion, UserMovieRating
+
+# every table a conditional page or endpoint renders from; the signals bump its row on each change, so an ETag
+# built from these versions is one indexed read. Usernames are left out, a login saves the user row every time.
+# base.html shows the movie, actor and director counts, so every page versions all three
+
+MOVIE_PAGE = (Movie, Director, Actor, Genre, Movie.actors.through, Movie.genres.through, MovieComment, UserMovieRating, Profile)
+ACTOR_PAGE = (Actor, Movie, Director, Movie.actors.through, ActorComment, Profile)
+DIRECTOR_PAGE = (Director, Movie, Actor, DirectorComment, Profile)
+MOVIE_API = (Movie, Director, Actor, Genre, Movie.actors.through, Movie.genres.through, Movie.users_to_watch.through, UserMovieRating)
+ACTOR_API = (Actor, Movie, Director, Movie.actors.through)
+# the community rating moves through a bare UPDATE on the movie row, only the rating table's version follows it
+MOVIE_LIST = (Movie, Director, Actor, Genre, Movie.actors.through, Movie.genres.through, UserMovieRating)
+PERSON_LIST = (Actor, Director, Movie, Movie.actors.through)
+
+VERSIONED_MODELS = frozenset(MOVIE_PAGE + ACTOR_PAGE + DIRECTOR_PAGE + MOVIE_API + ACTOR_API + MOVIE_LIST + PERSON_LIST)
+
+
+def bump_versions(*models):
+    now = timezone.now()
+    for model in models:
+        name = model._meta.db_table
+        if not TableVersion.objects.filter(name=name).update(version=F('version') + 1, modified=now):
+            _, created = TableVersion.objects.get_or_create(name=name, defaults={'version': 1, 'modified': now})
+            if not created:
+                TableVersion.objects.filter(name=name).update(version=F('version') + 1, modified=now)
+
+
+def version_stamp(models, variant=''):
+    names = sorted({model._meta.db_table for model in models})
+    versions = {name: (version, modified) for name, version, modified in TableVersion.objects.filter(name__in=names).values_list('name', 'version', 'modified')}
+    key = ','.join(f'{name}:{versions.get(name, (0,))[0]}' for name in names)
+    last_modified = max((modified for _, modified in versions.values()), default=None)
+    return hashlib.md5(f'{key}|{variant}'.encode()).hexdigest(), last_modified
@@ -1,9 +1,11 @@
 from django.contrib.auth import logout, authenticate, login
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Avg, Count, Q
-from django.http import HttpResponseRedirect
+from django.core.paginator import Page, Paginator
+from django.db.models import Prefetch
+from django.http import Http404, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse, reverse_lazy
+from django.utils.decorators import method_decorator
 from django.views.generic import TemplateView, ListView, DetailView, YearArchiveView, UpdateView, DeleteView
 from django.contrib import messages
 from django_filters.rest_framework import DjangoFilterBackend
@@ -12,10 +14,15 @@ from rest_framework.exceptions import PermissionDenied
 from rest_framework.generics import ListAPIView, RetrieveAPIView, UpdateAPIView, CreateAPIView, DestroyAPIView, RetrieveUpdateAPIView
 from rest_framework.permissions import IsAdminUser,IsAuthenticated
 
+from .autocomplete import prefix_index
+from .cache import cached_view, conditional_view, get_homepage_context
+from .export import EXPORT_FORMATS, export_lines, export_rows
 from .filters import *
 from .forms import *
 from .models import *
+from .search import SearchResults
 from .serializers import *
+from .versions import ACTOR_API, ACTOR_PAGE, DIRECTOR_PAGE, MOVIE_API, MOVIE_LIST, MOVIE_PAGE, PERSON_LIST
 
 # def index(request):
 #     return render(
@@ -29,29 +36,28 @@ class IndexView(TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['top_movies'] = Movie.objects.order_by('-rating')[:6]
-        context['top_actors_male'] = Actor.objects.filter(sex='M').annotate(avg_rating=Avg('movies__rating')).order_by('-avg_rating')[:6]
-        context['top_actors_female'] = Actor.objects.filter(sex='F').annotate(avg_rating=Avg('movies__rating')).order_by('-avg_rating')[:6]
-        context['top_directors'] = Director.objects.annotate(avg_rating=Avg('movies__rating')).order_by('-avg_rating')[:6]
-        context['all_movies'] = Movie.objects.order_by('date').distinct()
-        context['all_years'] = Movie.objects.values(year=models.functions.Extract('date', 'year')).annotate(num=Count('id')).order_by('year')
+        context.update(get_homepage_context())
+        if self.request.user.is_authenticated:
+            context['recommended_movies'] = Movie.objects.filter(recommendations__user=self.request.user).order_by('-recommendations__score')[:6]
         # context['search_form'] = SearchForm()
         return context
 
 
+@method_decorator(cached_view(PERSON_LIST), name='dispatch')
 class ActorListView(ListView):
     # model = Actor
-    queryset = Actor.objects.order_by('last_name').annotate(actor_rating=Avg('movies__rating', default=0.0))
+    queryset = Actor.objects.order_by('last_name')
     paginate_by = 6
 
 
+@method_decorator(conditional_view(ACTOR_PAGE), name='dispatch')
 class ActorDetailView(DetailView):
     model = Actor
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['actor_movies'] = self.object.movies.order_by('-date__year')
-        context['actor_rating'] = self.object.movies.aggregate(Avg("rating"))['rating__avg']
+        context['actor_rating'] = self.object.avg_rating
         if self.object.movies.exists():
             context['actor_trailer'] = self.object.movies.values_list('trailer', flat=True).order_by('?')[0]
         else:
@@ -60,51 +66,54 @@ class ActorDetailView(DetailView):
         return context
 
 
+@method_decorator(conditional_view(MOVIE_PAGE), name='dispatch')
 class MovieDetailView(DetailView):
     model = Movie
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['movie_rating'] = Movie.objects.filter(id=self.object.id).aggregate(Avg("rating"))['rating__avg']
+        context['movie_rating'] = self.object.rating
+        context['community_rating'] = self.object.community_rating
         context['comment_form'] = CommentForm()
         if self.request.user.is_authenticated:
             context['movie_count_in_lists'] = PersonalMovieList.objects.filter(movies=self.object).exclude(user=self.request.user).count()
             context['movie_count_in_myList'] = PersonalMovieList.objects.filter(movies=self.object, user=self.request.user).count()
             context['user_rating_form'] = UserRatingForm()
-            if UserMovieRating.objects.filter(user=self.request.user, movie=self.object).exists():
-                context['user_rating'] = UserMovieRating.objects.get(user=self.request.user, movie=self.object)
-            else:
-                context['user_rating'] = None
-            context['similar_movies'] = Movie.objects.exclude(id=self.object.id).filter(genres__in=self.object.genres.all()).distinct().annotate(num_genres=Count('genres')).order_by('-num_genres')[:3]
+            context['user_rating'] = UserMovieRating.objects.filter(user=self.request.user, movie=self.object).first()
+            context['similar_movies'] = Movie.objects.filter(similar_to__movie=self.object).order_by('-similar_to__score')[:3]
         return context
 
 
+@method_decorator(cached_view(MOVIE_LIST), name='dispatch')
 class MovieListView(ListView):
     queryset = Movie.objects.order_by('title')
     context_object_name = 'movies'
 
 
+@method_decorator(cached_view(MOVIE_LIST), name='dispatch')
 class MovieYearArchiveView(YearArchiveView):
-    queryset = Movie.objects.all()
+    queryset = Movie.objects.select_related('director').prefetch_related('actors')
     date_field = "date"
     make_object_list = True
     allow_future = True
 
 
+@method_decorator(cached_view(PERSON_LIST), name='dispatch')
 class DirectorListView(ListView):
     # model = Director
-    queryset = Director.objects.order_by('last_name', 'first_name').annotate(avg_rating=Avg('movies__rating', default=0.0), num_movies=Count('movies'))
+    queryset = Director.objects.order_by('last_name', 'first_name')
     context_object_name = 'directors'
     paginate_by = 6
 
 
+@method_decorator(conditional_view(DIRECTOR_PAGE), name='dispatch')
 class DirectorDetailView(DetailView):
     model = Director
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['director_movies'] = self.object.movies.order_by('-date__year')
-        context['director_rating'] = self.object.movies.aggregate(Avg("rating"))['rating__avg']
+        context['director_rating'] = self.object.avg_rating
         context['director_comment'] = DirectorCommentForm()
         if self.object.movies.exists():
             context['director_trailer'] = self.object.movies.values_list('trailer', flat=True).order_by('?')[0]
@@ -285,27 +294,41 @@ def remove_movie_from_personal_movie_list(request, pk1,pk2):
     return HttpResponseRedirect(reverse('imdb:user-movie-lists'))
 
 
+def _search_page(kind, pattern, page_number):
+    paginator = Paginator(SearchResults(kind, pattern), 12)
+    if page_number > paginator.num_pages:
+        return Page([], page_number, paginator)
+    return paginator.page(page_number)
+
+
 def search(request):
-    pattern = request.POST.get('pattern')
-    movie_list = Movie.objects.filter(title__istartswith=pattern)
-    actor_list = Actor.objects.filter(Q(first_name__istartswith=pattern) | Q(last_name__istartswith=pattern)).annotate(avg_rating=Avg("movies__rating", default=0.0))
-    director_list = Director.objects.filter(Q(first_name__istartswith=pattern) | Q(last_name__istartswith=pattern)).annotate(avg_rating=Avg("movies__rating", default=0.0))
+    pattern = request.GET.get('pattern') or request.POST.get('pattern', '')
+    page_number = request.GET.get('page', '1')
+    page_number = int(page_number) if page_number.isdigit() and int(page_number) > 0 else 1
     context = {}
-    context['movie_list'] = movie_list
-    context['actor_list'] = actor_list
-    context['director_list'] = director_list
+    context['movie_list'] = _search_page('movie', pattern, page_number)
+    context['actor_list'] = _search_page('actor', pattern, page_number)
+    context['director_list'] = _search_page('director', pattern, page_number)
+    context['has_next'] = any(context[key].has_next() for key in ('movie_list', 'actor_list', 'director_list'))
     context['pattern'] = pattern
     return render(request, template_name='imdb/search.html', context=context)
 
 
+def autocomplete(request):
+    limit = request.GET.get('limit', '10')
+    limit = min(int(limit), 50) if limit.isdigit() else 10
+    return JsonResponse({'results': prefix_index.complete(request.GET.get('q', ''), limit=limit)})
+
+
 def set_user_rate(request, pk):
     form = UserRatingForm(request.POST)
     movie = Movie.objects.get(id=pk)
     if form.is_valid():
-        new_rate = form.save(commit=False)
-        new_rate.user = request.user
-        new_rate.movie = movie
-        new_rate.save()
+        UserMovieRating.objects.update_or_create(
+            user=request.user,
+            movie=movie,
+            defaults={'value': form.cleaned_data['value']}
+        )
     return HttpResponseRedirect(reverse('imdb:movie-detail', kwargs={'slug': movie.slug}))
 
 
@@ -319,9 +342,13 @@ class UserProfileView(UpdateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['unread_message_num'] = Message.objects.filter(is_read=False, addressee=self.object).count()
+        context['movie_ratings'] = self.object.movie_ratings.select_related('movie')
+        context['movie_comments'] = self.object.comments.select_related('movie')
+        context['recommended_movies'] = Movie.objects.filter(recommendations__user=self.object).order_by('-recommendations__score')[:6]
         return context
 
 
+@method_decorator(cached_view(MOVIE_LIST), name='dispatch')
 class MovieByGenreView(DetailView):
     model = Genre
     template_name = 'imdb/movie_by_genre.html'
@@ -359,7 +386,7 @@ class ShowMessageView(LoginRequiredMixin, TemplateView):
 
 
 def send_message(request):
-    form = SendMessageForm(request.POST)
+    form = SendMessageForm(request.POST, user=request.user)
     if form.is_valid():
         new_message = form.save(commit=False)
         new_message.author = request.user
@@ -373,8 +400,8 @@ class MessageListView(ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['income_message_list'] = Message.objects.filter(addressee=self.request.user)
-        context['sent_message_list'] = Message.objects.filter(author=self.request.user)
+        context['income_message_list'] = Message.objects.filter(addressee=self.request.user).select_related('author')
+        context['sent_message_list'] = Message.objects.filter(author=self.request.user).select_related('addressee')
         return context
 
 
@@ -425,23 +452,38 @@ class FilterActorListView(FilterView, ListView):
     filterset_class = ActorFilter
 
 
+def export_movies(request, export_format):
+    if export_format not in EXPORT_FORMATS:
+        raise Http404
+    response = StreamingHttpResponse(export_lines(export_format, export_rows()), content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="movies.{export_format}"'
+    return response
+
+
+@method_decorator(conditional_view((Director,)), name='dispatch')
 class DirectorListAPIView(ListAPIView):
     queryset = Director.objects.all()
     serializer_class = DirectorSerializer1
+    keyset_ordering = ('last_name', 'first_name', 'id')
 
 
+@method_decorator(conditional_view((Actor,)), name='dispatch')
 class ActorListAPIView(ListAPIView):
     queryset = Actor.objects.filter(sex='M')
     serializer_class = ActorSerializer
+    keyset_ordering = ('last_name', 'first_name', 'id')
 
 
+@method_decorator(conditional_view(MOVIE_API), name='dispatch')
 class MovieListAPIView(ListAPIView):
-    queryset = Movie.objects.all()
+    queryset = Movie.objects.select_related('director').prefetch_related('actors', 'users_to_watch', 'user_rated_this_movie', 'genres')
     serializer_class = MovieSerializer
+    keyset_ordering = ('-date', '-id')
 
 
+@method_decorator(conditional_view(ACTOR_API), name='dispatch')
 class ActorDetailAPIView(RetrieveAPIView):
-    queryset = Actor.objects.all()
+    queryset = Actor.objects.prefetch_related(Prefetch('movies', queryset=Movie.objects.select_related('director')))
     serializer_class = ActorSerializerDetail
 
 
@@ -477,8 +519,9 @@ class DestroyMovieCommentAPIView(DestroyAPIView):
 
 
 class MessageListAPIView(ListAPIView):
-    queryset = Message.objects.all()
+    queryset = Message.objects.select_related('author', 'addressee')
     serializer_class = MessageSerializer
+    keyset_ordering = ('-created', '-id')
 
 
 class CreateMessageAPIView(CreateAPIView):
@@ -507,8 +550,9 @@ class DestroyMessageAPIView(DestroyAPIView):
 
 
 class PersonalMovieListAPIView(ListAPIView):
-    queryset = PersonalMovieList.objects.all()
+    queryset = PersonalMovieList.objects.select_related('user').prefetch_related('movies')
     serializer_class = PersonalMovieListSerializer
+    keyset_ordering = ('-created', '-id')
 
 
 class UpdatePersonalMovieListAPIView(RetrieveUpdateAPIView):
@@ -520,14 +564,27 @@ class UpdatePersonalMovieListAPIView(RetrieveUpdateAPIView):
         serializer.save(user=self.request.user)
 
 
+@method_decorator(conditional_view(ACTOR_API), name='dispatch')
 class SinglePageActorsListAPIView(ListAPIView):
-    queryset = Actor.objects.order_by('last_name').annotate(num_movies=Count('movies'), avg_rating=Avg('movies__rating', default=0.0))
+    queryset = Actor.objects.prefetch_related(Prefetch('movies', queryset=Movie.objects.only('id', 'title', 'date', 'slug')))
     serializer_class = SinglePageActorsListSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = ActorFilterByName
+    keyset_ordering = ('last_name', 'first_name', 'id')
 
 
+@method_decorator(conditional_view(MOVIE_API), name='dispatch')
 class SinglePageMovieListAPIView(ListAPIView):
-    queryset = Movie.objects.all()
+    queryset = (
+        Movie.objects
+        .select_related('director')
+        .only('id', 'title', 'poster', 'rating', 'rating_sum', 'rating_count', 'date', 'trailer', 'plot', 'slug', 'director__first_name', 'director__last_name')
+        .prefetch_related(
+            Prefetch('actors', queryset=Actor.objects.only('id', 'first_name', 'last_name')),
+            Prefetch('users_to_watch', queryset=User.objects.only('id', 'last_name')),
+            Prefetch('user_rated_this_movie', queryset=User.objects.only('id', 'username')),
+            Prefetch('genres', queryset=Genre.objects.only('id', 'name')),
+        )
+    )
     serializer_class = SinglePageMovieListSerializer
 
@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_1.settings')
 
 application = get_asgi_application()
+
+from imdb.autocomplete import warm_prefix_index  # noqa: E402
+
+warm_prefix_index()
@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import copy
+import os
 from pathlib import Path
 
+from imdb import sqlite
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -48,6 +52,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    'imdb.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -70,6 +75,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'imdb.context_processors.user_relations',
             ],
         },
     },
@@ -81,10 +87,81 @@ WSGI_APPLICATION = 'project_1.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
+# IMDB_DB_ENGINE=postgresql switches to PostgreSQL (needs psycopg, psycopg[pool] for IMDB_DB_POOL_MAX_SIZE).
+# Without a pool, connections persist for IMDB_DB_CONN_MAX_AGE seconds; Django's pool replaces persistent
+# connections, so CONN_MAX_AGE is forced to 0 when it is enabled.
+
+DATABASE_ENGINE = os.environ.get('IMDB_DB_ENGINE', 'sqlite3')
+
+if DATABASE_ENGINE == 'postgresql':
+    DATABASE_POOL_MAX_SIZE = int(os.environ.get('IMDB_DB_POOL_MAX_SIZE', 0))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('IMDB_DB_NAME', 'imdb'),
+            'USER': os.environ.get('IMDB_DB_USER', 'imdb'),
+            'PASSWORD': os.environ.get('IMDB_DB_PASSWORD', ''),
+            'HOST': os.environ.get('IMDB_DB_HOST', 'localhost'),
+            'PORT': os.environ.get('IMDB_DB_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if DATABASE_POOL_MAX_SIZE else int(os.environ.get('IMDB_DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if DATABASE_POOL_MAX_SIZE:
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('IMDB_DB_POOL_MIN_SIZE', 2)),
+            'max_size': DATABASE_POOL_MAX_SIZE,
+            'timeout': int(os.environ.get('IMDB_DB_POOL_TIMEOUT', 10)),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('IMDB_DB_NAME', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+
+# IMDB_DB_REPLICAS is a comma-separated list of read replicas (PostgreSQL hosts, or SQLite files). Reads go to a
+# random replica unless the request has written, or the client wrote in the last IMDB_REPLICA_STICKY_SECONDS.
+
+DATABASE_REPLICAS = []
+for number, location in enumerate(filter(None, os.environ.get('IMDB_DB_REPLICAS', '').split(',')), 1):
+    replica = copy.deepcopy(DATABASES['default'])
+    replica['HOST' if DATABASE_ENGINE == 'postgresql' else 'NAME'] = location.strip()
+    replica['TEST'] = {'MIRROR': 'default'}
+    DATABASES[f'replica_{number}'] = replica
+    DATABASE_REPLICAS.append(f'replica_{number}')
+
+DATABASE_ROUTERS = ['imdb.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.environ.get('IMDB_REPLICA_STICKY_SECONDS', 10))
+
+# how often a process compares its autocomplete index with the catalog table versions
+AUTOCOMPLETE_RECHECK_SECONDS = int(os.environ.get('IMDB_AUTOCOMPLETE_RECHECK_SECONDS', 5))
+
+# the PRAGMA profiles live in imdb/sqlite.py, which FastApi/main.py shares; IMDB_SQLITE_PROFILE=tuned opts in to WAL
+
+SQLITE_PROFILES = sqlite.SQLITE_PROFILES
+SQLITE_PRAGMAS = sqlite.profile_pragmas()
+
+
+# Cache
+# IMDB_CACHE_BACKEND selects locmem (default), file, redis (any Redis-compatible server) or dummy.
+
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'imdb'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+    'dummy': ('django.core.cache.backends.dummy.DummyCache', ''),
+}
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[os.environ.get('IMDB_CACHE_BACKEND', 'locmem')]
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('IMDB_CACHE_LOCATION', CACHE_LOCATION),
+        'TIMEOUT': int(os.environ.get('IMDB_CACHE_TIMEOUT', 60 * 5)),
+        'KEY_PREFIX': 'imdb',
     }
 }
 
@@ -138,3 +215,12 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_ALL_ORIGINS = True
+
+# files the app writes at runtime; IMDB_DATA_DIR moves them out of the project directory
+DATA_DIR = Path(os.environ.get('IMDB_DATA_DIR', BASE_DIR / 'data'))
+RECOMMENDER_MODEL_PATH = DATA_DIR / 'recommender.npz'
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'imdb.pagination.KeysetPagination',
+    'PAGE_SIZE': 20,
+}